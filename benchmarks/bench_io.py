@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Benchmark of the I/O strategies of the SIV digest loop
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import siv  # noqa: E402
+
+SIZES = [4 * 1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024, 256 * 1024 * 1024]
+
+
+def legacy_hash_file(file_path: str, hash_fuc: str) -> str:
+    """
+    the digest loop of SIV before the I/O layer, 1 KiB per read.
+    """
+    import hashlib
+    hash_obj = hashlib.new(hash_fuc)
+    f_size = os.stat(file_path).st_size
+    with open(file_path, mode='rb') as f:
+        while f_size:
+            content = f.read(1024)
+            hash_obj.update(content)
+            f_size -= len(content)
+    return hash_obj.hexdigest()
+
+
+def bench(hash_file, file_paths: list, min_bytes: int) -> float:
+    """
+    hash the files until at least "min_bytes" are read, return MB/s.
+    """
+    done = 0
+    start_time = time.perf_counter()
+    while done < min_bytes:
+        for file_path in file_paths:
+            hash_file(file_path)
+            done += os.path.getsize(file_path)
+    return done / (time.perf_counter() - start_time) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the I/O strategies of the digest loop.")
+    parser.add_argument('-H', dest="hash_fuc", default="sha256", choices=siv.HASH_LISTS,
+                        help="specify the hash function (default: sha256)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help="specify the file sizes in bytes")
+    parser.add_argument('--min-mb', type=int, default=256, help="read at least this many MB per measure")
+    parser.add_argument('--buffer-size', type=int, default=siv.DEFAULT_BUFFER_SIZE,
+                        help="specify the read buffer size of readinto")
+    parser.add_argument('--dir', default=None, help="create the test files here (default: a temporary directory)")
+    args = parser.parse_args()
+
+    strategies = {"legacy-1KiB": lambda p: legacy_hash_file(p, args.hash_fuc)}
+    for io_mode in siv.IO_LISTS:
+        hasher = siv.Hasher(args.hash_fuc, io_mode, args.buffer_size)
+        strategies[io_mode] = hasher.hash_file
+
+    print(f"{'size':>12}" + "".join(f"{name:>14}" for name in strategies) + "   (MB/s)")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        for f_size in args.sizes:
+            # enough files to cover "min_mb" once without re-reading the same one from cache only
+            files_num = max(1, min(64, args.min_mb * 1024 * 1024 // f_size))
+            file_paths = []
+            for i in range(files_num):
+                file_path = os.path.join(tmp_dir, f"{f_size}_{i}")
+                with open(file_path, 'wb') as f:
+                    f.write(os.urandom(f_size))
+                file_paths.append(file_path)
+
+            row = f"{f_size:>12}"
+            for hash_file in strategies.values():
+                row += f"{bench(hash_file, file_paths, args.min_mb * 1e6):>14.1f}"
+            print(row)
+
+            for file_path in file_paths:
+                os.remove(file_path)
+
+
+if __name__ == '__main__':
+    main()
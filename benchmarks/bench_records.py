@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+# Benchmark of the memory and the per-entry CPU of the verification records and the compare loop
+
+import argparse
+import hashlib
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import siv  # noqa: E402
+
+
+def make_records(entries_num: int):
+    """
+    synthetic records of regular files in sorted path order, 1000 files per directory.
+    """
+    mtime_ns = 1_700_000_000 * 10 ** 9
+    for i in range(entries_num):
+        f_info = siv.FileInfo(f"/data/d{i // 1000:05d}/f{i % 1000:03d}", 4096 + i % 65536, "root", "root",
+                              None, None, hashlib.sha256(i.to_bytes(8, "little")).hexdigest(),
+                              1000 + i, 64768, mtime_ns + i, mtime_ns + i)
+        f_info.f_mode = 0o100644
+        f_info.is_file = True
+        yield f_info
+
+
+def record_size(records_num: int = 100_000) -> float:
+    """
+    the bytes allocated per record read back from a csv row, the record and its fields.
+    """
+    rows = [[f_info.f_path, str(f_info.f_size), f_info.user_name, f_info.group_name, f_info.access_right,
+             f_info.modified_date, f_info.message_digest, str(f_info.inode), str(f_info.device),
+             str(f_info.ctime_ns), str(f_info.mtime_ns)] for f_info in make_records(records_num)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [siv.FileInfo(*row) for row in rows]
+    size = (tracemalloc.get_traced_memory()[0] - before) / records_num
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def bench_format(db_format: str, entries_num: int, tmp_dir: str, compress: str = None,
+                 compress_level: int = None) -> dict:
+    """
+    write a verification file of "entries_num" records, compressed with "compress",
+    then time reading it and comparing it with itself.
+    """
+    verification_file = os.path.join(tmp_dir, "records" + siv.FORMAT_EXTENSIONS[db_format]
+                                     + (siv.COMPRESS_EXTENSIONS[compress] if compress else ""))
+    start_time = time.perf_counter()
+    with siv.create_baseline(verification_file, "sha256", db_format, compress=compress,
+                             compress_level=compress_level) as baseline:
+        for f_info in make_records(entries_num):
+            baseline.write(f_info)
+    write_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with siv.open_baseline(verification_file) as baseline:
+        for _ in baseline:
+            pass
+    read_time = time.perf_counter() - start_time
+
+    # the verification of an unchanged tree: both sides read, every pair compared, no warning
+    start_time = time.perf_counter()
+    warnings_num = 0
+    with siv.open_baseline(verification_file) as old, siv.open_baseline(verification_file) as new:
+        for old_f_info, new_f_info in zip(old, new):
+            warnings_num += len(siv.compare_file_info(old_f_info, new_f_info))
+    compare_time = time.perf_counter() - start_time - read_time
+    if warnings_num:
+        sys.exit(f"The compare loop found {warnings_num} warnings in identical records.")
+
+    file_size = os.path.getsize(verification_file)
+    os.remove(verification_file)
+    return {"write_us": write_time / entries_num * 1e6, "read_us": read_time / entries_num * 1e6,
+            "compare_us": compare_time / entries_num * 1e6, "file_bytes": file_size / entries_num}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory and the per-entry CPU of the records.")
+    parser.add_argument('--entries', type=int, default=1_000_000,
+                        help="number of records of the verification file (default: 1000000), e.g. 10000000")
+    parser.add_argument('--format', dest="db_formats", nargs='+', choices=siv.FORMAT_LISTS,
+                        default=siv.FORMAT_LISTS, help="verification file formats (default: all)")
+    parser.add_argument('--compress', choices=siv.COMPRESS_LISTS, default=None,
+                        help="compress the verification files (default: no compression)")
+    parser.add_argument('--compress-level', type=int, default=None,
+                        help="the compression level (default: the one of the verification files)")
+    parser.add_argument('--dir', default=None,
+                        help="write the verification files here (default: a temporary directory)")
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'write us':>9} {'read us':>9} {'compare us':>11} {'file B':>8}   (per entry)")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        for db_format in args.db_formats:
+            result = bench_format(db_format, args.entries, tmp_dir, args.compress, args.compress_level)
+            print(f"{db_format:>8} {result['write_us']:>9.2f} {result['read_us']:>9.2f} "
+                  f"{result['compare_us']:>11.2f} {result['file_bytes']:>8.0f}")
+    # ru_maxrss is in KiB on Linux, the records are streamed so it stays flat with the number of entries
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    print(f"record size: {record_size():.0f} bytes per record read from csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+# Benchmark of the SIV initialization and verification throughput on synthetic trees
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import siv  # noqa: E402
+
+SIV_SCRIPT = os.path.join(ROOT_DIR, "siv.py")
+
+
+def make_tree(path: str, files_num: int, min_size: int, max_size: int, depth: int, fan_out: int, seed: int) -> int:
+    """
+    create a synthetic tree: "depth" levels of "fan_out" directories each,
+    "files_num" files spread over all the directories, with log-uniform sizes in [min_size, max_size].
+    return the total size of the files.
+    """
+    rnd = random.Random(seed)
+    dirs = [path]
+    level = [path]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"d{i}") for parent in level for i in range(fan_out)]
+        dirs += level
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+
+    total_size = 0
+    for i in range(files_num):
+        f_size = int(math.exp(rnd.uniform(math.log(max(min_size, 1)), math.log(max(max_size, 1)))))
+        if min_size == 0 and rnd.random() < 0.01:
+            f_size = 0
+        with open(os.path.join(dirs[i % len(dirs)], f"f{i}"), 'wb') as f:
+            f.write(rnd.randbytes(f_size))
+        total_size += f_size
+    return total_size
+
+
+def run_siv(argv: list) -> dict:
+    """
+    run siv.py in a child process, return its wall time and peak RSS.
+    """
+    start_time = time.perf_counter()
+    process = subprocess.Popen([sys.executable, SIV_SCRIPT] + argv, stdout=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start_time
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        sys.exit(f"siv.py {' '.join(argv)} failed with {process.returncode}.")
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak_rss = rusage.ru_maxrss * (1 if platform.system() == "Darwin" else 1024)
+    return {"seconds": wall_time, "peak_rss_bytes": peak_rss}
+
+
+def measure_phases(path: str, hash_fuc: str, csv_file: str) -> dict:
+    """
+    time every phase of the traversal on its own: walk, stat, name lookup, hashing and csv I/O.
+    the page cache is warm after the first run, so this is the CPU cost of each phase.
+    """
+    phases = {}
+
+    start_time = time.perf_counter()
+    entries = list(siv.scan_dir(path))
+    phases["walk"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    stats = [entry.stat() for entry in entries]
+    phases["stat"] = time.perf_counter() - start_time
+
+    resolver = siv.NameResolver()
+    start_time = time.perf_counter()
+    for file_stat in stats:
+        resolver.user_name(file_stat.st_uid)
+        resolver.group_name(file_stat.st_gid)
+    phases["name_lookup"] = time.perf_counter() - start_time
+
+    hasher = siv.Hasher(hash_fuc)
+    resolver = siv.NameResolver()
+    f_infos = list(siv.collect_dir(path, resolver))
+    start_time = time.perf_counter()
+    for f_info in f_infos:
+        if f_info.is_file:
+            f_info.message_digest = hasher.hash_file(f_info.f_path)
+    phases["hashing"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with siv.CsvBaselineWriter(csv_file, hash_fuc) as baseline:
+        for f_info in f_infos:
+            baseline.write(f_info)
+    with siv.CsvBaselineReader(csv_file) as baseline:
+        for _ in baseline:
+            pass
+    phases["csv_io"] = time.perf_counter() - start_time
+    os.remove(csv_file)
+
+    return phases
+
+
+def compare_results(results: dict, old_results: dict, tolerance: float) -> list:
+    """
+    the throughputs which dropped by more than "tolerance" against the old results.
+    """
+    regressions = []
+    old_runs = {(run["hash"], run["mode"]): run for run in old_results["runs"]}
+    for run in results["runs"]:
+        old_run = old_runs.get((run["hash"], run["mode"]))
+        if old_run is None:
+            continue
+        for key in ("files_per_second", "mb_per_second"):
+            if run[key] < old_run[key] * (1 - tolerance):
+                regressions.append(f"{run['hash']} {run['mode']} {key}: {old_run[key]:.1f} -> {run[key]:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SIV initialization and verification modes.")
+    parser.add_argument('--files', type=int, default=2000, help="number of files (default: 2000)")
+    parser.add_argument('--min-size', type=int, default=0, help="minimal file size in bytes (default: 0)")
+    parser.add_argument('--max-size', type=int, default=1024 * 1024, help="maximal file size in bytes (default: 1 MiB)")
+    parser.add_argument('--depth', type=int, default=3, help="depth of the directory tree (default: 3)")
+    parser.add_argument('--fan-out', type=int, default=4, help="sub-directories per directory (default: 4)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the tree generator (default: 0)")
+    parser.add_argument('-H', dest="hash_fucs", nargs='+', choices=siv.HASH_LISTS, default=sorted(siv.HASH_LISTS),
+                        help="hash functions to run (default: all)")
+    parser.add_argument('--siv-args', default="", help="extra arguments for siv.py, e.g. \"-j 4\"")
+    parser.add_argument('--dir', default=None, help="create the tree here (default: a temporary directory)")
+    parser.add_argument('-o', dest="output", default=None, help="write the results as JSON to this file")
+    parser.add_argument('--compare', default=None, help="JSON results of an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="allowed drop of throughput against '--compare' (default: 0.1)")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "shape": {"files": args.files, "min_size": args.min_size, "max_size": args.max_size,
+                  "depth": args.depth, "fan_out": args.fan_out, "seed": args.seed},
+        "siv_args": args.siv_args,
+        "runs": [],
+    }
+    extra_args = args.siv_args.split()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        tree = os.path.join(tmp_dir, "tree")
+        total_size = make_tree(tree, args.files, args.min_size, args.max_size, args.depth, args.fan_out, args.seed)
+        entries_num = sum(1 for _ in siv.scan_dir(tree))
+        results["shape"]["total_bytes"] = total_size
+        results["shape"]["entries"] = entries_num
+
+        print(f"{'hash':>10} {'mode':>6} {'files/s':>10} {'MB/s':>8} {'RSS MiB':>8}   phases (s)")
+        for hash_fuc in args.hash_fucs:
+            verification_file = os.path.join(tmp_dir, f"{hash_fuc}.csv")
+            phases = measure_phases(tree, hash_fuc, os.path.join(tmp_dir, "phases.csv"))
+            for mode in ("i", "v"):
+                report_file = os.path.join(tmp_dir, f"{hash_fuc}_{mode}.txt")
+                argv = [f"-{mode}", "-D", tree, "-V", verification_file, "-R", report_file] + extra_args
+                if mode == "i":
+                    argv += ["-H", hash_fuc]
+                run = run_siv(argv)
+                run.update({
+                    "hash": hash_fuc,
+                    "mode": "init" if mode == "i" else "verify",
+                    "files_per_second": entries_num / run["seconds"],
+                    "mb_per_second": total_size / run["seconds"] / 1e6,
+                    "phases": phases,
+                })
+                results["runs"].append(run)
+                print(f"{hash_fuc:>10} {run['mode']:>6} {run['files_per_second']:>10.0f} "
+                      f"{run['mb_per_second']:>8.1f} {run['peak_rss_bytes'] / 1024 / 1024:>8.1f}   "
+                      + " ".join(f"{name}={seconds:.3f}" for name, seconds in phases.items()))
+            os.remove(verification_file)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# System Integrity Verifier(SIV)
+
+"""
+A very simple system integrity verifier(SIV), as a library:
+
+    import siv
+    result = siv.init("important_directory", "verificationDB.csv", "report.txt", "sha256")
+    result = siv.verify("important_directory", "verificationDB.csv", "report2.txt", fast=True)
+    print(result.warnings, result.files, result.total_time)
+    results = siv.compare(["golden.csv", "host1.csv", "host2.csv"], "report.txt")
+
+"siv.init()" and "siv.verify()" are the initialization and verification modes, which write the same files
+as the command line and return a "RunResult", "siv.compare()" compares verification files.
+every other name of "siv.core" is also here.
+the modes do not ask or exit, an error raises "siv.SivError", and an existing file which a mode would
+overwrite "siv.ExistingFileError", unless its "overwrite" allows it.
+"import siv" alone loads nothing, the core is imported on the first use of one of its names.
+"""
+
+from importlib import import_module
+
+# the names of the library which are not the ones of the core
+ALIASES = {"init": "initialization_mode", "verify": "verification_mode", "watch": "watch_mode",
+           "compare": "compare_mode"}
+
+
+def __getattr__(name: str):
+    if name == "main":
+        from .cli import main
+        return main
+    core = import_module(".core", __name__)
+    try:
+        return getattr(core, ALIASES.get(name, name))
+    except AttributeError:
+        raise AttributeError(f"module 'siv' has no attribute '{name}'") from None
+
+
+def __dir__():
+    core = import_module(".core", __name__)
+    return sorted(set(globals()) | set(ALIASES) | {"main"} | {n for n in dir(core) if not n.startswith("_")})
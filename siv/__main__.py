@@ -0,0 +1,5 @@
+# System Integrity Verifier(SIV), "python -m siv"
+
+from .cli import main
+
+main()
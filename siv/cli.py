@@ -0,0 +1,375 @@
+# System Integrity Verifier(SIV), the command line
+
+import argparse
+import logging
+import os
+import sys
+
+# the parser only needs the light constants, the core is imported once the arguments are parsed
+from .constants import (HASH_LISTS, BACKEND_LISTS, FAST_HASH_NAMES, DEEP_PERIOD, PIPELINE_LISTS, IO_LISTS,
+                        DEFAULT_BUFFER_SIZE, MMAP_THRESHOLD, CHUNK_THRESHOLD, CHECKPOINT_INTERVAL, FORMAT_LISTS,
+                        FORMAT_EXTENSIONS, COMPRESS_NAMES, COMPRESS_EXTENSIONS, COMPRESS_LEVELS, OPTIONAL_PACKAGES,
+                        ATTRIBUTE_LISTS, REPORT_LISTS, REPORT_EXTENSIONS, METRICS_LISTS, IONICE_LISTS)
+
+
+def check_overwrite(file: str) -> bool:
+    """
+    ask the user whether to overwrite the existing file.
+    """
+    answer = input(f"Do you want to overwrite the '{file}'? [Y/n]")
+    if answer.lower() == 'y' or answer.lower() == 'yes':
+        return True
+    elif answer.lower() == 'n' or answer.lower() == 'no':
+        return False
+    else:
+        sys.exit("Unrecognized input, abort.")
+
+
+def run_mode(mode_function, *args, **kwargs):
+    """
+    run a mode, which refuses to overwrite an existing file, ask the user about that file,
+    and run the mode again with every file the user agreed to overwrite so far.
+    """
+    from .core import ExistingFileError
+    overwrite = set()
+    while True:
+        try:
+            return mode_function(*args, overwrite=overwrite, **kwargs)
+        except ExistingFileError as e:
+            print(f"The {e.kind} already exists.")
+            if not check_overwrite(e.file):
+                sys.exit(f"The {e.kind} remains, abort.")
+            overwrite.add(e.file)
+
+
+def main():
+    # the notes of the library are printed like the messages of the command line
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.INFO)
+    parser = build_parser()
+    args = parser.parse_args()
+    from .core import SivError
+    try:
+        run(parser, args)
+    except SivError as e:
+        sys.exit(str(e))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    the parser of the command line.
+    """
+    description_text = "A very simple system integrity verifier(SIV)."
+    example_text = '''
+    Example 1: Initialization mode
+    siv.py -i -D important_directory -V verificationDB.csv -R my_report.txt -H sha1
+    Example 2: Verification mode
+    siv.py -v -D important_directory -V verificationDB.csv -R my_report2.txt
+    Example 3: Hash with 8 workers
+    siv.py -v -D important_directory -V verificationDB.csv -R my_report3.txt -j 8 --backend process
+    Example 4: Compare two verification files
+    siv.py --compare-db golden.csv host.csv -R my_report4.txt'''
+
+    parser = argparse.ArgumentParser(description=description_text,
+                                     epilog=example_text,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+
+    exc_group = parser.add_mutually_exclusive_group(required=True)  # at least one argument
+    exc_group.add_argument('-i', dest="mode", action="store_const", const='i', help="use the initialization mode")
+    exc_group.add_argument('-v', dest="mode", action="store_const", const='v', help="use the verification mode")
+    exc_group.add_argument('-m', dest="shard_reports", metavar="shard_report", nargs='+',
+                           help="merge the reports of the shards of one run into the report file")
+    exc_group.add_argument('--compare-db', dest="compare_files", metavar="verification_file", nargs='+',
+                           help="compare the first verification file with each of the others, without the\n"
+                                "file system, by the rules of the first one with '--exclude', '--include', '--check';\n"
+                                "with several others, every comparison has a report 'name.<its name>.ext'")
+
+    parser.add_argument('-D', dest="monitored_dir", metavar="monitored_directory", nargs='+',
+                        help="specify the path of the monitored directory, or several of them")
+    parser.add_argument('-V', dest="verification_file", metavar="verification_file", nargs=1,
+                        help="specify the path of the verification file")
+    parser.add_argument('-R', dest="report_file", metavar="report_file", nargs=1, required=True,
+                        help="specify the path of the report file")
+    parser.add_argument('-H', dest="hash_fuc", nargs=1, choices=HASH_LISTS, help="specify the hash function")
+    parser.add_argument('-j', dest="jobs", metavar="N", type=int, default=1,
+                        help="specify the number of hashing workers (default: 1)")
+    parser.add_argument('--backend', dest="backend", choices=BACKEND_LISTS, default="thread",
+                        help="specify the pool of the hashing workers (default: thread)\n"
+                             "thread: suits large files, hashlib releases the GIL on large buffers\n"
+                             "process: suits many small files")
+    parser.add_argument('--pipeline', dest="pipeline", choices=PIPELINE_LISTS, default="pool",
+                        help="specify how the traversal runs (default: pool)\n"
+                             "pool: walk and stat in order, hash with the '-j' workers\n"
+                             "async: overlap the walk, the stats and the hashing in asyncio stages\n"
+                             "with bounded queues, suits network file systems")
+    parser.add_argument('--fast', dest="fast", action="store_true",
+                        help="only hash the files whose size, inode, device, ctime or mtime changed\n"
+                             "(verification mode, leave it out for a full audit)")
+    parser.add_argument('--io', dest="io_mode", choices=IO_LISTS, default="readinto",
+                        help="specify how the files are read for hashing (default: readinto)\n"
+                             "readinto: one reused buffer of '--buffer-size' bytes\n"
+                             "mmap: map the whole file into memory\n"
+                             f"auto: mmap for files of {MMAP_THRESHOLD // 1024 // 1024} MiB and more, else readinto\n"
+                             "file_digest: hashlib.file_digest() of Python 3.11\n"
+                             "a mapped file truncated during the run, e.g. by a log rotation, kills SIV with SIGBUS,\n"
+                             "only use mmap and auto on trees which do not change meanwhile")
+    parser.add_argument('--buffer-size', dest="buffer_size", metavar="BYTES", type=int, default=DEFAULT_BUFFER_SIZE,
+                        help=f"specify the read buffer size (default: {DEFAULT_BUFFER_SIZE})")
+    parser.add_argument('--persist-names', dest="persist_names", action="store_true",
+                        help="store the user and group names in the verification file (initialization mode)\n"
+                             "take them from there instead of looking them up (verification mode),\n"
+                             "renamed users and groups are then not detected")
+    parser.add_argument('--watch', dest="watch", action="store_true",
+                        help="keep running after the verification, check the paths reported by inotify\n"
+                             "and append the warnings to the report file (verification mode)")
+    parser.add_argument('--sweep-interval', dest="sweep_interval", metavar="SECONDS", type=float, default=3600,
+                        help="seconds between two full sweeps of the watch mode (default: 3600)")
+    parser.add_argument('--exclude', dest="excludes", metavar="GLOB", action="append", default=[],
+                        help="leave out the matching paths, excluded directories are not traversed\n"
+                             "(a pattern with '/' matches the whole path, otherwise the name)")
+    parser.add_argument('--include', dest="includes", metavar="GLOB", action="append", default=[],
+                        help="only keep the matching files, directories are always traversed")
+    parser.add_argument('--check', dest="checks", metavar="GLOB=ATTRS", action="append", default=[],
+                        help="only compare these attributes of the matching paths, the first matching rule applies\n"
+                             f"attributes: {','.join(ATTRIBUTE_LISTS)}, e.g. '/var/log/*=size,user,group,mode'\n"
+                             "the rules are stored in the verification file and apply to the verification mode")
+    parser.add_argument('--follow-symlinks', dest="follow_symlinks", action="store_true",
+                        help="take the symbolic links for their targets as the older versions did (initialization\n"
+                             "mode), by default a link is recorded with the path it points to and never read;\n"
+                             "the verification mode handles them as stored in the verification file")
+    parser.add_argument('--metrics', dest="metrics_format", choices=METRICS_LISTS, default=None,
+                        help="write the time of every phase, the counters and the hash latency histogram\n"
+                             "next to the report file, as JSON or as a Prometheus textfile")
+    parser.add_argument('--format', dest="db_format", choices=FORMAT_LISTS, default="csv",
+                        help="specify the format of the verification file (default: csv)\n"
+                             "binary: compact and indexed, detected by the verification mode")
+    parser.add_argument('--compress', dest="compress", choices=COMPRESS_NAMES, default=None,
+                        help="compress the verification file as it is written (initialization mode), detected\n"
+                             "by the verification mode; a compressed binary file is decompressed into a temporary\n"
+                             "file to be read, and a compressed file has no checkpoint (zstd needs zstandard)")
+    parser.add_argument('--compress-level', dest="compress_level", metavar="N", type=int, default=None,
+                        help="trade CPU for size, " + ", ".join(f"{compress} {low}-{high} (default: {default})"
+                                                             for compress, (low, default, high)
+                                                             in COMPRESS_LEVELS.items()))
+    parser.add_argument('--report-format', dest="report_format", choices=REPORT_LISTS, default="text",
+                        help="specify the format of the report file (default: text)\n"
+                             "jsonl: JSON Lines, an object per finding and a summary object at the end")
+    parser.add_argument('--fast-hash', dest="fast_fuc", choices=FAST_HASH_NAMES, default=None,
+                        help="also store a fast digest of every file (initialization mode), the verification mode\n"
+                             "then only computes the fast digests, except for the files of '--deep-period'\n"
+                             "(xxh64 and xxh3_64 need the xxhash package)")
+    parser.add_argument('--deep-period', dest="deep_period", metavar="DAYS", type=int, default=None,
+                        help="with fast digests, also compute the digest of the hash function for a different\n"
+                             f"1/DAYS of the files every day, so every file in DAYS days (default: {DEEP_PERIOD}),\n"
+                             "0 is never")
+    parser.add_argument('--deep', dest="deep", action="store_true",
+                        help="with fast digests, compute the digest of the hash function for every file")
+    parser.add_argument('--chunk-size', dest="chunk_size", metavar="BYTES", type=int, default=0,
+                        help="hash the large files in chunks of BYTES in parallel, with '-j' threads, and store the\n"
+                             "digests of the chunks (initialization mode), the verification mode then reports\n"
+                             "the byte ranges which changed (default: 0, no chunks), e.g. 67108864")
+    parser.add_argument('--chunk-threshold', dest="chunk_threshold", metavar="BYTES", type=int,
+                        default=CHUNK_THRESHOLD,
+                        help=f"the size from which files are hashed in chunks (default: {CHUNK_THRESHOLD})")
+    parser.add_argument('--sample-chunks', dest="sample_chunks", metavar="N", type=int, default=0,
+                        help="only hash N chunks of every file of chunk digests, picked at random, for a quick\n"
+                             "check of large files (verification mode, default: 0, all of them)")
+    parser.add_argument('--max-mbps', dest="max_mbps", metavar="MB", type=float, default=0,
+                        help="read at most MB megabytes per second for hashing, over all the workers\n"
+                             "(default: 0, no limit)")
+    parser.add_argument('--max-fps', dest="max_fps", metavar="N", type=float, default=0,
+                        help="hash at most N files per second, over all the workers (default: 0, no limit)")
+    parser.add_argument('--nice', dest="nice", metavar="N", type=int, default=0,
+                        help="lower the CPU priority of the run by N (default: 0)")
+    parser.add_argument('--ionice', dest="ionice", choices=IONICE_LISTS, default=None,
+                        help="set the I/O class of the run, Linux with the BFQ or CFQ scheduler\n"
+                             "best-effort: the lowest priority of the default class\n"
+                             "idle: only read when no other program uses the disk")
+    parser.add_argument('--drop-cache', dest="drop_cache", action="store_true",
+                        help="drop every hashed file from the page cache, so that the run does not push\n"
+                             "the pages of other programs out of it")
+    parser.add_argument('--shard', dest="shard", metavar="K/N", default=None,
+                        help="only initialize the K-th of N path ranges of the monitored directories,\n"
+                             "the range is stored in the verification file and applies to the verification mode;\n"
+                             "run the shards on several machines and merge their reports with '-m'")
+    parser.add_argument('--shard-bounds', dest="bounds_file", metavar="FILE", default=None,
+                        help="the path ranges of the N shards of '--shard', computed by the first shard which runs\n"
+                             "and read by the others, copy it to the other machines (required with '--shard')")
+    parser.add_argument('--shards', dest="shards_num", metavar="N", type=int, default=None,
+                        help="run N shards in parallel processes, with the files 'name.shardKofN.ext',\n"
+                             "and merge their reports into the report file")
+    parser.add_argument('--checkpoint-interval', dest="checkpoint_interval", metavar="SECONDS", type=float,
+                        default=CHECKPOINT_INTERVAL,
+                        help="save the progress every SECONDS into 'file.checkpoint', next to the verification\n"
+                             "file (initialization mode) or the report file (verification mode)\n"
+                             f"(default: {CHECKPOINT_INTERVAL}, 0 for no checkpoint)")
+    parser.add_argument('--resume', dest="resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint, with the same arguments")
+    return parser
+
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    check the parsed arguments and run the mode.
+    """
+    from .core import (FAST_HASH_LISTS, COMPRESS_LISTS, Rules, Throttle, set_priority, stored_shard_bounds,
+                       initialization_mode, verification_mode, watch_mode, run_shards, merge_reports, compare_mode)
+    for name in (args.fast_fuc, args.compress):
+        if name is not None and name not in FAST_HASH_LISTS + COMPRESS_LISTS:
+            parser.error(f"'{name}' needs the {OPTIONAL_PACKAGES[name]} package.")
+
+    mode = args.mode
+    monitored_dir = args.monitored_dir
+    report_file = args.report_file[0]
+    if os.path.splitext(report_file)[-1] == "":
+        report_file += REPORT_EXTENSIONS[args.report_format]
+
+    try:
+        rules = Rules(args.excludes, args.includes, args.checks, follow_symlinks=args.follow_symlinks)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # merge the shard reports
+    if args.shard_reports:
+        merge_reports(args.shard_reports, report_file)
+        return
+
+    # compare verification files
+    if args.compare_files:
+        if len(args.compare_files) < 2:
+            parser.error("The comparison('--compare-db') needs two verification files or more.")
+        print("Start the comparison mode.")
+        for result in run_mode(compare_mode, args.compare_files, report_file, rules=rules,
+                               report_format=args.report_format):
+            print(f"The number of warnings against the '{result.verification_file}' is '{result.warnings}', "
+                  f"the report file is stored in the '{result.report_file}'.")
+        print("Finish the comparison mode.")
+        return
+
+    if monitored_dir is None or args.verification_file is None:
+        parser.error("The monitored directory('-D') and the verification file('-V') are required.")
+    verification_file = args.verification_file[0]
+
+    if args.jobs < 1:
+        parser.error("The number of hashing workers('-j') must be at least 1.")
+    if args.buffer_size < 1:
+        parser.error("The read buffer size('--buffer-size') must be at least 1.")
+
+    if args.deep_period is not None and args.deep_period < 0:
+        parser.error("The deep period('--deep-period') can not be negative.")
+    deep_period = 1 if args.deep else DEEP_PERIOD if args.deep_period is None else args.deep_period
+
+    if args.chunk_size < 0 or args.chunk_threshold < 1 or args.sample_chunks < 0:
+        parser.error("The chunk size('--chunk-size') and the samples('--sample-chunks') can not be negative,\n"
+                     "the chunk threshold('--chunk-threshold') must be at least 1.")
+
+    if args.max_mbps < 0 or args.max_fps < 0 or args.nice < 0:
+        parser.error("The limits('--max-mbps', '--max-fps') and the nice value('--nice') can not be negative.")
+    # a process of a pool or a shard gets its own copy of the throttle, and its share of the rates
+    shares = (args.jobs if args.backend == "process" and args.jobs > 1 else 1) * (args.shards_num or 1)
+    throttle = Throttle(args.max_mbps, args.max_fps, shares)
+    if args.nice or args.ionice:
+        set_priority(args.nice, args.ionice)
+
+    if args.checkpoint_interval < 0:
+        parser.error("The checkpoint interval('--checkpoint-interval') can not be negative.")
+    if args.resume and args.watch:
+        parser.error("The watch mode('--watch') can not be resumed('--resume').")
+
+    if args.shards_num is not None and args.shards_num < 1:
+        parser.error("The number of shards('--shards') must be at least 1.")
+    if args.shards_num is not None and (args.shard or args.watch):
+        parser.error("The shards('--shards') can not be used with '--shard' or '--watch'.")
+    if args.shard:
+        shard, _, shards_num = args.shard.partition("/")
+        if not (shard.isdigit() and shards_num.isdigit() and 1 <= int(shard) <= int(shards_num)):
+            parser.error("The shard('--shard') must be 'K/N' with 1 <= K <= N.")
+        if mode != 'i':
+            parser.error("The shard('--shard') is taken from the verification file in the verification mode.")
+        if args.bounds_file is None:
+            parser.error("The shard('--shard') needs the bounds file('--shard-bounds') shared by all the shards.")
+        bounds = stored_shard_bounds(args.bounds_file, monitored_dir, int(shards_num), rules)
+        rules = rules.shard(bounds[int(shard) - 1])
+
+    if args.compress_level is not None:
+        if args.compress is None:
+            parser.error("The compression level('--compress-level') needs the compression('--compress').")
+        low, _, high = COMPRESS_LEVELS[args.compress]
+        if not low <= args.compress_level <= high:
+            parser.error(f"The compression level('--compress-level') of {args.compress} must be {low} to {high}.")
+
+    if os.path.splitext(verification_file)[-1] == "":
+        verification_file += FORMAT_EXTENSIONS[args.db_format]
+        if args.compress is not None:
+            verification_file += COMPRESS_EXTENSIONS[args.compress]
+
+    # initialization mode
+    if mode == 'i':
+        print("Start the initialization mode.")
+
+        if args.hash_fuc is None:
+            parser.error("The hash function('-H') is required in the initialization mode.")
+        hash_fuc = args.hash_fuc[0]
+        if args.fast:
+            parser.error("The fast verification('--fast') can not be used in the initialization mode.")
+        if args.watch:
+            parser.error("The watch mode('--watch') can not be used in the initialization mode.")
+        if args.deep or args.deep_period is not None:
+            parser.error("The deep verification('--deep', '--deep-period') is for the verification mode.")
+        if args.sample_chunks:
+            parser.error("The sampled chunks('--sample-chunks') are for the verification mode.")
+        if args.compress and args.resume:
+            parser.error("A compressed verification file('--compress') has no checkpoint to resume('--resume').")
+
+        kwargs = dict(hash_fuc=hash_fuc, jobs=args.jobs, backend=args.backend, db_format=args.db_format,
+                      io_mode=args.io_mode, buffer_size=args.buffer_size, persist_names=args.persist_names,
+                      metrics_format=args.metrics_format, rules=rules, pipeline=args.pipeline,
+                      fast_fuc=args.fast_fuc, report_format=args.report_format,
+                      checkpoint_interval=args.checkpoint_interval, resume=args.resume, chunk_size=args.chunk_size,
+                      chunk_threshold=args.chunk_threshold, throttle=throttle, drop_cache=args.drop_cache,
+                      compress=args.compress, compress_level=args.compress_level)
+        if args.shards_num:
+            run_mode(run_shards, initialization_mode, monitored_dir, verification_file, report_file,
+                     args.shards_num, **kwargs)
+            print("Finish the initialization mode.")
+            return
+        result = run_mode(initialization_mode, monitored_dir, verification_file, report_file, **kwargs)
+        print("Finish the initialization mode.")
+        print(f"The verification file is stored in the '{result.verification_file}'.")
+        print(f"The report file is stored in the '{result.report_file}'.")
+
+    # verification mode
+    else:  # mode == 'v'
+        if args.hash_fuc is not None or args.fast_fuc is not None:
+            parser.error("The hash functions('-H', '--fast-hash') can not be used in the verification mode.")
+        elif args.chunk_size:
+            parser.error("The chunk size('--chunk-size') is taken from the verification file in the verification mode.")
+        elif args.compress:
+            parser.error("The compression('--compress') of the verification file is detected in the verification mode.")
+        elif args.follow_symlinks:
+            parser.error("The symbolic links('--follow-symlinks') are handled as stored in the verification file\n"
+                         "in the verification mode.")
+        else:
+            print("Start the verification mode.")
+
+        kwargs = dict(jobs=args.jobs, backend=args.backend, fast=args.fast, io_mode=args.io_mode,
+                      buffer_size=args.buffer_size, persist_names=args.persist_names, rules=rules,
+                      pipeline=args.pipeline, report_format=args.report_format, throttle=throttle,
+                      drop_cache=args.drop_cache)
+        if args.watch:
+            result = run_mode(watch_mode, monitored_dir, verification_file, report_file,
+                              sweep_interval=args.sweep_interval, **kwargs)
+            print("Finish the watch mode.")
+            print(f"The report file is stored in the '{result.report_file}'.")
+            return
+        kwargs.update(metrics_format=args.metrics_format, deep_period=deep_period,
+                      checkpoint_interval=args.checkpoint_interval, resume=args.resume,
+                      sample_chunks=args.sample_chunks)
+        if args.shards_num:
+            run_mode(run_shards, verification_mode, monitored_dir, verification_file, report_file,
+                     args.shards_num, **kwargs)
+            print("Finish the verification mode.")
+            return
+        result = run_mode(verification_mode, monitored_dir, verification_file, report_file, **kwargs)
+        print("Finish the verification mode.")
+        print(f"The report file is stored in the '{result.report_file}'.")
+
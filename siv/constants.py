@@ -0,0 +1,32 @@
+# System Integrity Verifier(SIV), the choices and defaults of the options
+
+# the command line builds its parser from these names alone, the core and the probes of the optional packages
+# are only loaded once the arguments are parsed, so that "--help" and a wrong option answer at once
+import hashlib
+
+HASH_LISTS = list(hashlib.algorithms_guaranteed)
+BACKEND_LISTS = ["thread", "process"]
+# the fast digests of the two-tier mode, checksums without tamper resistance,
+# "siv.core.FAST_HASH_LISTS" are the ones whose package is installed
+FAST_HASH_NAMES = ["blake2b-64", "crc32", "xxh64", "xxh3_64"]
+DEEP_PERIOD = 7  # days in which every file gets the digest of the hash function again, in the two-tier mode
+PIPELINE_LISTS = ["pool", "async"]
+IO_LISTS = ["readinto", "mmap", "auto", "file_digest"]
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 16 * 1024 * 1024
+CHUNK_THRESHOLD = 1024 * 1024 * 1024  # files of chunk digests are at least this large
+IONICE_LISTS = ["best-effort", "idle"]
+CHECKPOINT_INTERVAL = 60  # seconds between two checkpoints of a run
+FORMAT_LISTS = ["csv", "binary"]
+FORMAT_EXTENSIONS = {"csv": ".csv", "binary": ".sivdb"}
+# "siv.core.COMPRESS_LISTS" are the ones whose package is installed
+COMPRESS_NAMES = ["gzip", "xz", "zstd"]
+COMPRESS_EXTENSIONS = {"gzip": ".gz", "xz": ".xz", "zstd": ".zst"}
+COMPRESS_LEVELS = {"gzip": (1, 6, 9), "xz": (0, 6, 9), "zstd": (1, 3, 22)}  # lowest, default, highest
+# the fast digests and the compressions which need a package outside the standard library
+OPTIONAL_PACKAGES = {"xxh64": "xxhash", "xxh3_64": "xxhash", "zstd": "zstandard"}
+
+ATTRIBUTE_LISTS = ["size", "user", "group", "mode", "date", "digest"]
+REPORT_LISTS = ["text", "jsonl"]
+REPORT_EXTENSIONS = {"text": ".txt", "jsonl": ".jsonl"}
+METRICS_LISTS = ["json", "prom"]
@@ -0,0 +1,3282 @@
+# System Integrity Verifier(SIV), the core: traversal, hashing, verification files, reports and the modes
+
+# the modules which only some runs need, the pools, multiprocessing, json, asyncio and the optional xxhash,
+# are imported where they are used, the command line starts without them
+from __future__ import annotations  # the annotations are not evaluated, "Generator[...]" needs no typing
+
+import os
+import sys
+import csv
+import logging
+import errno
+import io
+import pwd
+import grp
+import time
+import hashlib
+import stat
+import struct
+import re
+import fnmatch
+import mmap
+import threading
+import zlib
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from array import array
+from collections import deque, namedtuple
+from collections.abc import Generator
+from importlib.util import find_spec
+
+from .constants import (HASH_LISTS, BACKEND_LISTS, FAST_HASH_NAMES, DEEP_PERIOD, PIPELINE_LISTS, IO_LISTS,
+                        DEFAULT_BUFFER_SIZE, MMAP_THRESHOLD, CHUNK_THRESHOLD, IONICE_LISTS, CHECKPOINT_INTERVAL,
+                        FORMAT_LISTS, FORMAT_EXTENSIONS, COMPRESS_NAMES, COMPRESS_EXTENSIONS, COMPRESS_LEVELS,
+                        OPTIONAL_PACKAGES, ATTRIBUTE_LISTS, REPORT_LISTS, REPORT_EXTENSIONS, METRICS_LISTS)
+
+_thread_buffers = threading.local()
+_chunk_pool = None  # (process id, threads, pool), see "chunk_pool()"
+_chunk_pool_lock = threading.Lock()
+# the notes of a run, the command line prints them, a library caller configures "logging" to see them
+logger = logging.getLogger("siv")
+# the fast digests and the compressions whose package is installed
+FAST_HASH_LISTS = [name for name in FAST_HASH_NAMES
+                   if name not in OPTIONAL_PACKAGES or find_spec(OPTIONAL_PACKAGES[name]) is not None]
+COMPRESS_LISTS = [name for name in COMPRESS_NAMES
+                  if name not in OPTIONAL_PACKAGES or find_spec(OPTIONAL_PACKAGES[name]) is not None]
+HASH_BATCH_SIZE = 64  # files per task of the process pool
+ASYNC_BATCH_SIZE = 128  # entries per batch of the walk and stat stages
+ASYNC_QUEUE_SIZE = 4096  # entries in flight between the stages
+IOPRIO_CLASSES = {"best-effort": 2, "idle": 3}
+# the number of the ioprio_set system call, which has no wrapper in the C library
+IOPRIO_SET_SYSCALLS = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314, "ppc64le": 273,
+                       "s390x": 282, "riscv64": 30}
+COMPRESS_MAGICS = {"gzip": b"\x1f\x8b", "xz": b"\xfd7zXZ\x00", "zstd": b"\x28\xb5\x2f\xfd"}
+
+# binary verification file:
+#   header:  magic, version, length of the hash function name, hash function name
+#   records: one per entry in sorted path order, "RECORD_STRUCT" followed by the path, the raw digest,
+#            the raw fast digest and the target of a symbolic link
+#   names:   the string table of user and group names, each one prefixed by its length
+#   index:   the offsets of the records, for the binary search of a path
+#   sections: named tables of extra rows, each one a name, the number of rows and the rows,
+#             a row is its length followed by its fields joined by NUL
+#   footer:  "FOOTER_STRUCT", offset and size of the string table, of the index and of the sections
+DB_MAGIC = b"SIVDB"
+DB_VERSION = 1
+HEADER_STRUCT = struct.Struct("<5sBB")
+# path length, size, user, group, mode, mtime_ns, ctime_ns, inode, device, digest length, fast digest length,
+# link target length
+RECORD_STRUCT = struct.Struct("<HqIIIqqQQBBH")
+NAME_STRUCT = struct.Struct("<H")
+SECTION_ROW_STRUCT = struct.Struct("<I")
+FOOTER_STRUCT = struct.Struct("<QQQQQQ5s")
+# csv verification file: the named tables of extra rows follow the records,
+# a row of a table starts with "#" and the table name, the last row points to the first one
+CSV_TRAILER = "#trailer"
+
+REPORT_BATCH_SIZE = 1024  # lines per bulk write of the report
+# a finding of the verification: "deleted", "created", "restored", or "changed" with the attribute,
+# the old and the new value, or "split" with the paths of a hard link set and the groups of them
+# which now have different inodes, or "ranges" with the byte ranges [start, end) of the changed chunks
+Finding = namedtuple("Finding", ["kind", "path", "attribute", "old", "new"], defaults=[None, None, None])
+WARNING_TITLES = {"size": "Size", "user": "User", "group": "group", "mode": "Access right", "date": "Date",
+                  "fast_digest": "Fast digest", "digest": "Digest", "target": "Link target"}
+WARNING_INDENT = " " * 46  # the old and new values of a warning line up in the text report
+# the outcome of a run of a mode, the counters of "dirs", "files" and "trusted_files" are also in "metrics"
+RunResult = namedtuple("RunResult", ["mode", "monitored_dirs", "verification_file", "report_file", "dirs", "files",
+                                     "warnings", "trusted_files", "total_time", "metrics"])
+
+PHASES = ["enumeration", "stat", "owner_lookup", "file_open", "read", "hash", "throttle",
+          "db_read", "db_write", "compare", "report_write"]
+ALL_ATTRIBUTES = frozenset(ATTRIBUTE_LISTS)
+# upper bounds of the buckets of the per-file hash latency histogram, in seconds
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+class SivError(Exception):
+    """
+    an error which stops a run, its message is for the user.
+    """
+
+
+class ExistingFileError(SivError):
+    """
+    an existing file which a run would overwrite, see "may_overwrite()".
+    """
+
+    def __init__(self, file: str, kind: str):
+        super().__init__(f"The {kind} '{file}' already exists.")
+        self.file = file
+        self.kind = kind
+
+
+class Rules:
+    """
+    the glob rules of the traversal: excluded paths, included files, the attributes to check per path,
+    the path range of a shard and whether symbolic links are followed. a pattern with a "/" matches the whole
+    path, otherwise the name; excluded directories are not traversed.
+    """
+    def __init__(self, excludes: list = (), includes: list = (), checks: list = (), path_range: tuple = None,
+                 follow_symlinks: bool = False):
+        self.excludes = list(excludes)
+        self.includes = list(includes)
+        self.path_range = path_range
+        self.follow_symlinks = follow_symlinks
+        self.pruned = set()  # the unchanged sub trees of a verification, not stored
+        self.checks = []
+        for check in checks:
+            pattern, _, attributes = check.rpartition("=")
+            attributes = [a.strip() for a in attributes.split(",") if a.strip()]
+            unknown = set(attributes) - set(ATTRIBUTE_LISTS)
+            if not pattern or unknown:
+                raise ValueError(f"The check rule '{check}' is not 'pattern=attribute,...' "
+                                 f"with the attributes {', '.join(ATTRIBUTE_LISTS)}.")
+            self.checks.append((pattern, frozenset(attributes)))
+        self.exclude_match = self.compile(self.excludes)
+        self.include_match = self.compile(self.includes)
+        self.check_matches = [(self.compile([pattern]), attributes) for pattern, attributes in self.checks]
+
+    @staticmethod
+    def compile(patterns: list):
+        """
+        one matcher of (path, name) for all the patterns, None without patterns.
+        """
+        path_patterns = [fnmatch.translate(p) for p in patterns if "/" in p]
+        name_patterns = [fnmatch.translate(p) for p in patterns if "/" not in p]
+        path_re = re.compile("|".join(path_patterns)).match if path_patterns else None
+        name_re = re.compile("|".join(name_patterns)).match if name_patterns else None
+        if path_re is None and name_re is None:
+            return None
+        return lambda path, name: bool((path_re and path_re(path)) or (name_re and name_re(name)))
+
+    def __bool__(self):
+        return bool(self.excludes or self.includes or self.checks or self.path_range or self.pruned
+                    or self.follow_symlinks)
+
+    def in_range(self, path: str) -> bool:
+        if self.path_range is None:
+            return True
+        low, high = self.path_range
+        return (low is None or path >= low) and (high is None or path < high)
+
+    def subtree_in_range(self, path: str) -> bool:
+        """
+        whether some path below the directory "path" may be in the path range.
+        they all sort in [path + "/", path + "0"), "0" being the character after "/".
+        """
+        if self.path_range is None:
+            return True
+        low, high = self.path_range
+        return (low is None or path + chr(ord(os.sep) + 1) > low) and (high is None or path + os.sep < high)
+
+    def descend(self, path: str) -> bool:
+        """
+        whether to traverse the directory "path".
+        """
+        return path not in self.pruned and self.subtree_in_range(path)
+
+    def is_pruned(self, path: str) -> bool:
+        """
+        whether "path" is below one of the pruned directories.
+        """
+        if not self.pruned:
+            return False
+        parent = os.path.dirname(path)
+        while parent not in self.pruned:
+            path, parent = parent, os.path.dirname(parent)
+            if parent == path:
+                return False
+        return True
+
+    def check_rules(self) -> list:
+        return [f"{p}={','.join(sorted(a))}" for p, a in self.checks]
+
+    def shard(self, path_range: tuple):
+        """
+        the same rules, for the paths in "path_range" only.
+        """
+        return Rules(self.excludes, self.includes, self.check_rules(), path_range, self.follow_symlinks)
+
+    def __reduce__(self):
+        # the compiled matchers are lambdas, rebuild them from the patterns
+        return Rules, (self.excludes, self.includes, self.check_rules(), self.path_range, self.follow_symlinks)
+
+    def keep(self, path: str, name: str, is_dir: bool) -> bool:
+        if self.exclude_match is not None and self.exclude_match(path, name):
+            return False
+        if self.include_match is not None and not is_dir:
+            return self.include_match(path, name)
+        return True
+
+    def attributes(self, path: str) -> frozenset:
+        name = os.path.basename(path)
+        for match, attributes in self.check_matches:
+            if match(path, name):
+                return attributes
+        return ALL_ATTRIBUTES
+
+    def save(self, baseline):
+        """
+        store the rules in the verification file, the verification mode applies the same ones.
+        """
+        rows = [["exclude", p] for p in self.excludes] + [["include", p] for p in self.includes]
+        rows += [["check", check] for check in self.check_rules()]
+        if self.path_range is not None:
+            rows.append(["range", *("" if bound is None else bound for bound in self.path_range)])
+        rows.append(["symlinks", "follow" if self.follow_symlinks else "record"])
+        baseline.write_section("rules", rows)
+
+    @classmethod
+    def load(cls, baseline):
+        """
+        the rules stored in the verification file.
+        the verification files of older versions have no "symlinks" rule, their traversal followed the links.
+        """
+        rows = baseline.read_section("rules") or []
+        kinds = {"exclude": [], "include": [], "check": []}
+        path_range = None
+        follow_symlinks = True
+        for kind, *rule in rows:
+            if kind == "range":
+                path_range = tuple(bound or None for bound in rule)
+            elif kind == "symlinks":
+                follow_symlinks = rule[0] == "follow"
+            else:
+                kinds[kind].append(rule[0])
+        return cls(kinds["exclude"], kinds["include"], kinds["check"], path_range, follow_symlinks)
+
+    def merge(self, given):
+        """
+        these stored rules with the rules "given" for a verification, if any: their excludes and checks
+        are added, the checks given first, and their includes and path range replace the stored ones.
+        the symbolic links are handled as stored.
+        """
+        if given is None:
+            return self
+        return Rules(self.excludes + [p for p in given.excludes if p not in self.excludes],
+                     given.includes or self.includes, given.check_rules() + self.check_rules(),
+                     given.path_range or self.path_range, self.follow_symlinks)
+
+
+def joined_dirs(monitored_dir) -> str:
+    """
+    the monitored directories for the report.
+    """
+    return "', '".join(monitored_dirs(monitored_dir))
+
+
+def monitored_dirs(monitored_dir) -> list:
+    """
+    the absolute paths of one or several monitored directories,
+    in the order in which their content sorts.
+    """
+    dirs = [monitored_dir] if isinstance(monitored_dir, str) else list(monitored_dir)
+    return sorted({os.path.abspath(d) for d in dirs}, key=lambda d: d + os.sep)
+
+
+def shard_bounds(monitored_dir, shards_num: int, rules: Rules = None) -> list:
+    """
+    split the monitored directories into "shards_num" path ranges [low, high) of about the same number of
+    paths in the first two levels, None being no bound; the shards which run apart share them, see
+    "stored_shard_bounds()".
+    """
+    # the roots themselves are not traversed, they keep the bounds inside the tree if it is empty
+    candidates = monitored_dirs(monitored_dir)
+    levels = [(d, 0) for d in candidates]
+    while levels:
+        path, depth = levels.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if rules and not rules.keep(entry.path, entry.name, is_dir):
+                        continue
+                    candidates.append(entry.path)
+                    if is_dir and depth < 1:
+                        levels.append((entry.path, depth + 1))
+        except OSError:
+            continue
+    candidates.sort()
+    bounds = [None] + [candidates[k * len(candidates) // shards_num] for k in range(1, shards_num)] + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def stored_shard_bounds(bounds_file: str, monitored_dir, shards_num: int, rules: Rules = None) -> list:
+    """
+    the "shard_bounds()" stored in "bounds_file", computed and stored by the first shard if it does not exist.
+    the shards which read the same bounds, on this machine or on others with a copy of the file,
+    neither overlap nor leave a gap, whenever they run.
+    """
+    import json
+    dirs = monitored_dirs(monitored_dir)
+    if not os.path.isfile(bounds_file):
+        bounds = shard_bounds(dirs, shards_num, rules)
+        with open(bounds_file, 'w') as f:
+            json.dump({"monitored_dirs": dirs, "bounds": bounds}, f)
+        logger.info(f"The shard bounds are stored in the '{os.path.abspath(bounds_file)}'.")
+        return bounds
+    try:
+        with open(bounds_file) as f:
+            stored = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SivError(f"The shard bounds file '{bounds_file}' can not be read: {e}.")
+    if stored.get("monitored_dirs") != dirs or len(stored.get("bounds", ())) != shards_num:
+        raise SivError(f"The shard bounds file '{bounds_file}' is not the one of {shards_num} shards of "
+                       f"'{joined_dirs(dirs)}'.")
+    return [tuple(bounds) for bounds in stored["bounds"]]
+
+
+def shard_file(file: str, shard: int, shards_num: int) -> str:
+    """
+    the verification file or report file of a shard, e.g. "db.shard2of4.csv".
+    """
+    stem, extension = os.path.splitext(file)
+    return f"{stem}.shard{shard}of{shards_num}{extension}"
+
+
+def no_clock() -> float:
+    return 0.0
+
+
+class Metrics:
+    """
+    timers and counters of the phases of a run, and the histogram of the per-file hash latency.
+    the workers of the hashing pool fill their own instance, which is merged into the one of the run.
+    without "timed", only the counters are kept, and "clock()" does not read the clock.
+    """
+    def __init__(self, timed: bool = True):
+        self.timed = timed
+        self.clock = time.perf_counter if timed else no_clock
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.counters = {}
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # the last bucket is +Inf
+        self.latency_sum = 0.0
+
+    def add_time(self, phase: str, seconds: float):
+        if self.timed:
+            self.seconds[phase] += seconds
+
+    @contextmanager
+    def timer(self, phase: str):
+        start_time = self.clock()
+        try:
+            yield
+        finally:
+            self.add_time(phase, self.clock() - start_time)
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_latency(self, seconds: float):
+        if not self.timed:
+            return
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+
+    def merge(self, other):
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] += seconds
+        for name, value in other.counters.items():
+            self.count(name, value)
+        for i, value in enumerate(other.latency_buckets):
+            self.latency_buckets[i] += value
+        self.latency_sum += other.latency_sum
+
+    def to_dict(self) -> dict:
+        return {
+            "phases_seconds": self.seconds,
+            "counters": self.counters,
+            "hash_latency_seconds": {
+                "buckets": dict(zip([str(le) for le in LATENCY_BUCKETS] + ["+Inf"], self.latency_buckets)),
+                "sum": self.latency_sum,
+                "count": sum(self.latency_buckets),
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        lines = ["# HELP siv_phase_seconds_total Time spent in each phase of the run.",
+                 "# TYPE siv_phase_seconds_total counter"]
+        lines += [f'siv_phase_seconds_total{{phase="{phase}"}} {seconds}' for phase, seconds in self.seconds.items()]
+        lines += ["# HELP siv_events_total Counters of the run.",
+                  "# TYPE siv_events_total counter"]
+        lines += [f'siv_events_total{{name="{name}"}} {value}' for name, value in self.counters.items()]
+        lines += ["# HELP siv_hash_latency_seconds Time to hash one file.",
+                  "# TYPE siv_hash_latency_seconds histogram"]
+        cumulative = 0
+        for le, value in zip([str(le) for le in LATENCY_BUCKETS] + ["+Inf"], self.latency_buckets):
+            cumulative += value
+            lines.append(f'siv_hash_latency_seconds_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"siv_hash_latency_seconds_sum {self.latency_sum}")
+        lines.append(f"siv_hash_latency_seconds_count {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, metrics_file: str, metrics_format: str):
+        """
+        write the metrics as JSON or as a Prometheus textfile,
+        replace the file at once, so that a collector never reads half of it.
+        """
+        import json
+        tmp_file = metrics_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            if metrics_format == "prom":
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_file, metrics_file)
+
+
+class NullMetrics(Metrics):
+    """
+    the metrics of a caller which does not want any, e.g. a single file hashed: nothing is timed or counted.
+    """
+    def __init__(self):
+        super().__init__(timed=False)
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def metrics_path(report_file: str, metrics_format: str) -> str:
+    """
+    the metrics file next to the report file.
+    """
+    return os.path.splitext(report_file)[0] + ".metrics." + metrics_format
+
+
+def to_int(value):
+    """
+    convert a field read from a verification file, an empty field is None.
+    """
+    return None if value is None or value == '' else int(value)
+
+
+def format_time_ns(time_ns: int) -> str:
+    """
+    a timestamp in nanoseconds for the report, in UTC whatever the timezone of the host.
+    """
+    seconds, nanoseconds = divmod(time_ns, 10 ** 9)
+    return f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(seconds))}.{nanoseconds:09d} UTC"
+
+
+class FileInfo:
+    """
+    a single file's information, a record with slots.
+    the access right and the date are derived from "f_mode" and "mtime_ns" when first read, the verification
+    files of older versions may only have the texts.
+    """
+    __slots__ = ("f_path", "f_size", "user_name", "group_name", "_access_right", "_modified_date",
+                 "message_digest", "inode", "device", "ctime_ns", "mtime_ns", "fast_digest",
+                 "link_target", "f_mode", "checks", "is_file", "to_hash", "links", "chunks")
+
+    def __init__(self, f_path=None, f_size=None, user_name=None,
+                 group_name=None, access_right=None,
+                 modified_date=None, message_digest=None,
+                 inode=None, device=None, ctime_ns=None, mtime_ns=None, fast_digest=None, link_target=None,
+                 f_mode=None):
+        self.f_path = f_path
+        self.f_size = to_int(f_size)
+        self.user_name = user_name
+        self.group_name = group_name
+        self._access_right = access_right
+        self._modified_date = modified_date
+        self.message_digest = message_digest or None
+        # stat fingerprint, missing in the verification files of older versions
+        self.inode = to_int(inode)
+        self.device = to_int(device)
+        self.ctime_ns = to_int(ctime_ns)
+        self.mtime_ns = to_int(mtime_ns)
+        self.fast_digest = fast_digest or None  # the checksum of the two-tier mode
+        self.link_target = link_target or None
+        self.f_mode = to_int(f_mode)
+        self.checks = ALL_ATTRIBUTES  # the attributes to compare
+        self.is_file = False
+        self.to_hash = False
+        self.links = None  # the number of hard links, only known from the stat of a traversal
+        self.chunks = None  # the digests of the chunks of a large file, see "Hasher"
+
+    @property
+    def access_right(self):
+        if self._access_right is None and self.f_mode is not None:
+            self._access_right = stat.filemode(self.f_mode)  # symbolic
+        return self._access_right
+
+    @access_right.setter
+    def access_right(self, access_right):
+        self._access_right = access_right
+
+    @property
+    def modified_date(self):
+        if self.mtime_ns is not None:
+            return format_time_ns(self.mtime_ns)
+        return self._modified_date
+
+    @modified_date.setter
+    def modified_date(self, modified_date):
+        self._modified_date = modified_date
+
+    def asctime(self):
+        """
+        the modification date as the verification files of older versions store it, in the local time.
+        """
+        if self.mtime_ns is not None:
+            return time.asctime(time.localtime(self.mtime_ns // 10 ** 9))
+        return self._modified_date
+
+    def __bool__(self):
+        return bool(self.f_path)
+
+    def is_directory(self) -> bool:
+        if self.f_mode is not None:
+            return stat.S_ISDIR(self.f_mode)
+        return (self.access_right or "").startswith("d")
+
+    def file_id(self) -> tuple:
+        """
+        the (device, inode) of the file, which a file replaced under the same path does not share.
+        """
+        return self.device, self.inode
+
+    def fingerprint(self):
+        """
+        the stat fields which change whenever the content of the file may have changed.
+        """
+        fields = (self.f_size, self.inode, self.device, self.ctime_ns, self.mtime_ns)
+        return None if None in fields else fields
+
+
+class Checkpoint:
+    """
+    the progress of a long run, saved every "interval" seconds as JSON: the last path done,
+    the counters of the records done and the offsets of the output files, for the run of "identity" only.
+    """
+    def __init__(self, checkpoint_file: str, identity: dict, interval: float = CHECKPOINT_INTERVAL):
+        self.checkpoint_file = checkpoint_file
+        self.identity = identity
+        self.interval = interval
+        self.next_time = time.monotonic() + interval
+        self.counts = {"dirs": 0, "files": 0, "trusted_files": 0, "fast_only_files": 0}
+
+    def add(self, f_info: FileInfo):
+        if not self.interval:
+            return
+        if f_info.f_mode is not None and stat.S_ISDIR(f_info.f_mode):
+            self.counts["dirs"] += 1
+            return
+        self.counts["files"] += 1
+        if f_info.is_file and not f_info.to_hash:
+            if f_info.message_digest is not None:
+                self.counts["trusted_files"] += 1
+        elif f_info.is_file and f_info.message_digest is None and f_info.fast_digest is not None:
+            self.counts["fast_only_files"] += 1
+
+    def due(self) -> bool:
+        return bool(self.interval) and time.monotonic() >= self.next_time
+
+    def save(self, last_path: str, state: dict):
+        """
+        replace the checkpoint at once, a kill in the middle leaves the one before.
+        """
+        import json
+        tmp_file = self.checkpoint_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(dict(self.identity, last_path=last_path, counts=self.counts, **state), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.checkpoint_file)
+        self.next_time = time.monotonic() + self.interval
+
+    def load(self) -> dict:
+        import json
+        try:
+            with open(self.checkpoint_file) as f:
+                state = json.load(f)
+        except OSError:
+            raise SivError(f"The checkpoint '{self.checkpoint_file}' does not exist, nothing to resume.")
+        except ValueError:
+            raise SivError(f"The checkpoint '{self.checkpoint_file}' is damaged.")
+        if any(state.get(key) != value for key, value in self.identity.items()):
+            raise SivError(f"The checkpoint '{self.checkpoint_file}' belongs to another run.")
+        self.counts = state["counts"]
+        return state
+
+    def remove(self):
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+
+def resume_range(path_range: tuple, last_path: str) -> tuple:
+    """
+    "path_range" without the paths up to "last_path", NUL is the character right after the end of a path.
+    """
+    low, high = path_range or (None, None)
+    resume_low = last_path + "\0"
+    return max(low, resume_low) if low is not None else resume_low, high
+
+
+class NameResolver:
+    """
+    resolve uids and gids into user and group names, every id is looked up once per run.
+    an id without a name resolves into the id itself.
+    """
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.hits = 0
+        self.misses = 0
+
+    def user_name(self, uid: int) -> str:
+        name = self.users.get(uid)
+        if name is not None:
+            self.hits += 1
+            return name
+        self.misses += 1
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        self.users[uid] = name
+        return name
+
+    def group_name(self, gid: int) -> str:
+        name = self.groups.get(gid)
+        if name is not None:
+            self.hits += 1
+            return name
+        self.misses += 1
+        try:
+            name = grp.getgrgid(gid).gr_name
+        except KeyError:
+            name = str(gid)
+        self.groups[gid] = name
+        return name
+
+    def save(self, baseline):
+        """
+        store the resolved names in the verification file.
+        """
+        baseline.write_section("users", [[uid, name] for uid, name in self.users.items()])
+        baseline.write_section("groups", [[gid, name] for gid, name in self.groups.items()])
+
+    def load(self, baseline) -> bool:
+        """
+        take the names stored in the verification file instead of looking them up.
+        """
+        users = baseline.read_section("users")
+        groups = baseline.read_section("groups")
+        if users is None or groups is None:
+            return False
+        self.users.update((int(uid), name) for uid, name in users)
+        self.groups.update((int(gid), name) for gid, name in groups)
+        return True
+
+
+class MerkleTree:
+    """
+    the digests of the directories, over the compared attributes and digests of their entries and the
+    digests of their sub directories; a directory is finished, and only its digest kept, once the sorted
+    traversal has passed it.
+    """
+    def __init__(self, hash_fuc: str, monitored_dir):
+        self.hash_fuc = hash_fuc
+        self.roots = set(monitored_dirs(monitored_dir))
+        # directory with the separator -> [directory, hash object over its entries in the order of the traversal,
+        # (path, digest) of its finished sub directories, whether it is a root or has a record]
+        self.open_dirs = {}
+        self.open_keys = []  # the keys of "open_dirs", sorted
+        self.finished = {}  # directory -> digest, in the order they are finished
+        for root in self.roots:
+            self.open_dir(root, True)
+
+    def open_dir(self, directory: str, known: bool) -> list:
+        key = os.path.join(directory, "")
+        state = self.open_dirs.get(key)
+        if state is None:
+            state = self.open_dirs[key] = [directory, None, [], known]
+            insort(self.open_keys, key)
+        return state
+
+    def pass_to(self, path: str):
+        """
+        finish the directories whose content sorts before "path", the deepest ones first.
+        """
+        end = bisect_right(self.open_keys, path)
+        passed = [key for key in self.open_keys[:end] if not path.startswith(key)]
+        for key in reversed(passed):
+            self.finish(key)
+
+    def finish(self, key: str):
+        directory, hash_obj, sub_dirs, known = self.open_dirs.pop(key)
+        self.open_keys.remove(key)
+        if not known:  # the content of a directory outside the path range, which has no record
+            return
+        hash_obj = hash_obj or hashlib.new(self.hash_fuc)
+        for sub_dir, digest in sorted(sub_dirs):
+            hash_obj.update(os.fsencode(f"{os.path.basename(sub_dir)}\0{digest}\n"))
+        digest = self.finished[directory] = hexdigest(hash_obj)
+        if directory not in self.roots:  # the parent holds the record of the directory, so it is still open
+            self.open_dirs[os.path.join(os.path.dirname(directory), "")][2].append((directory, digest))
+
+    def add(self, f_info: FileInfo):
+        self.pass_to(f_info.f_path)
+        parent, name = os.path.split(f_info.f_path)
+        state = self.open_dir(parent, False)
+        if state[1] is None:
+            state[1] = hashlib.new(self.hash_fuc)
+        checks = f_info.checks
+        fields = [name, f_info.f_size if "size" in checks else "", f_info.user_name if "user" in checks else "",
+                  f_info.group_name if "group" in checks else "", f_info.access_right if "mode" in checks else "",
+                  (f_info.mtime_ns if f_info.mtime_ns is not None else f_info.modified_date)
+                  if "date" in checks else "",
+                  f_info.message_digest if "digest" in checks else ""]
+        if f_info.link_target is not None:  # the digests of the links which are not followed also cover it
+            fields.append(f_info.link_target if "digest" in checks else "")
+        state[1].update(os.fsencode("\0".join(map(str, fields)) + "\n"))
+        if f_info.is_directory():
+            self.open_dir(f_info.f_path, True)
+
+    def digests(self) -> dict:
+        """
+        the digest of every directory and of the monitored directories, every directory after its sub directories.
+        """
+        for key in reversed(self.open_keys[:]):
+            self.finish(key)
+        return self.finished
+
+    def save(self, baseline):
+        baseline.write_section("merkle", [[directory, digest] for directory, digest in self.digests().items()])
+
+    @staticmethod
+    def load(baseline):
+        """
+        the directory digests stored in the verification file, None if there are none.
+        """
+        rows = baseline.read_section("merkle")
+        return None if rows is None else {directory: digest for directory, digest in rows}
+
+
+class LinkSets:
+    """
+    the hard link sets of a tree: the paths of every file with several links, by (device, inode).
+    the sets of the initialization mode are stored in the verification file, the verification mode
+    finds the sets whose paths no longer share one inode.
+    """
+    def __init__(self, rows: list = ()):
+        self.paths = {}
+        for device, inode, *paths in rows:
+            self.paths[(int(device), int(inode))] = list(paths)
+
+    def add(self, f_info: FileInfo):
+        if f_info.is_file and f_info.links is not None and f_info.links > 1:
+            self.paths.setdefault((f_info.device, f_info.inode), []).append(f_info.f_path)
+
+    def rows(self, min_paths: int = 2) -> list:
+        """
+        the sets as rows of the device, the inode and the paths,
+        a file whose other links are outside the tree is a set of one path.
+        """
+        return [[device, inode, *paths] for (device, inode), paths in self.paths.items() if len(paths) >= min_paths]
+
+    def save(self, baseline, min_paths: int = 2):
+        baseline.write_section("links", self.rows(min_paths))
+
+    @classmethod
+    def load(cls, baseline):
+        return cls(baseline.read_section("links") or [])
+
+    def splits(self, new_keys: dict, rules: Rules = None) -> list:
+        """
+        the findings about the sets whose paths now have several inodes, "new_keys" maps a path of the sets
+        to its (device, inode) in the tree, the paths under the unchanged sub trees of "rules" keep theirs.
+        the paths which are gone are reported as deleted, not here.
+        """
+        findings = []
+        for key, paths in self.paths.items():
+            groups = {}
+            for path in paths:
+                new_key = new_keys.get(path) or (key if rules and rules.is_pruned(path) else None)
+                if new_key is not None:
+                    groups.setdefault(tuple(new_key), []).append(path)
+            if len(groups) > 1:
+                findings.append(Finding("split", paths[0], "links", paths, list(groups.values())))
+        return findings
+
+
+class LinkDedup:
+    """
+    hash every inode once: of the paths of a file with several hard links, only the first one is hashed,
+    "mark()" before the hashing tells the others not to, "fill()" after it, in the same order,
+    gives them the digests of the first one.
+    """
+    def __init__(self, hasher: Hasher, metrics: Metrics = None):
+        self.hasher = hasher
+        self.metrics = metrics
+        self.firsts = {}  # (device, inode, deep) -> the FileInfo of the first path
+        self.copies = {}  # path -> the FileInfo of the first path of its inode
+
+    def mark(self, file_info: FileInfo) -> FileInfo:
+        if file_info.to_hash and file_info.links is not None and file_info.links > 1:
+            # the two-tier mode picks the files of a deep digest by their path
+            key = (file_info.device, file_info.inode, self.hasher.is_deep(file_info.f_path))
+            first = self.firsts.setdefault(key, file_info)
+            if first is not file_info:
+                file_info.to_hash = False
+                self.copies[file_info.f_path] = first
+        return file_info
+
+    def fill(self, file_info: FileInfo) -> FileInfo:
+        first = self.copies.pop(file_info.f_path, None) if self.copies else None
+        if first is not None:
+            file_info.message_digest, file_info.fast_digest = first.message_digest, first.fast_digest
+            file_info.chunks = first.chunks
+            if self.metrics is not None:
+                self.metrics.count("linked_files")
+        return file_info
+
+
+class ChunkDigests:
+    """
+    the chunk digests of the large files of a tree, see "Hasher", stored in the verification file
+    with the chunk size and the threshold, the verification mode hashes the files in the same chunks.
+    """
+    def __init__(self, chunk_size: int = 0, chunk_threshold: int = CHUNK_THRESHOLD, rows: list = ()):
+        self.chunk_size = chunk_size
+        self.chunk_threshold = chunk_threshold
+        self.digests = {path: digests for path, *digests in rows}
+
+    def add(self, f_info: FileInfo):
+        if f_info.chunks:
+            self.digests[f_info.f_path] = f_info.chunks
+
+    def rows(self) -> list:
+        return [[path, *digests] for path, digests in self.digests.items()]
+
+    def save(self, baseline):
+        if self.chunk_size:
+            baseline.write_section("chunking", [[self.chunk_size, self.chunk_threshold]])
+            baseline.write_section("chunks", self.rows())
+
+    @classmethod
+    def load(cls, baseline):
+        chunking = baseline.read_section("chunking")
+        if not chunking:
+            return cls()
+        return cls(int(chunking[0][0]), int(chunking[0][1]), baseline.read_section("chunks") or ())
+
+    def settings(self) -> tuple:
+        """
+        what the digests of the large files depend on, the same for two verification files which can be compared.
+        """
+        return (self.chunk_size, self.chunk_threshold) if self.chunk_size else (0, None)
+
+    def __str__(self):
+        if not self.chunk_size:
+            return "none"
+        return f"{self.chunk_size} bytes for the files of {self.chunk_threshold} bytes and more"
+
+    def ranges(self, f_info: FileInfo):
+        """
+        the finding about the byte ranges of the chunks of "f_info" which changed, adjacent ones joined,
+        None if it has no chunk digests on both sides. the chunks beyond a smaller size are left out,
+        the size change is reported on its own.
+        """
+        old_chunks = self.digests.get(f_info.f_path)
+        if not old_chunks or not f_info.chunks:
+            return None
+        ranges = []
+        for index, digest in enumerate(f_info.chunks):
+            if index < len(old_chunks) and old_chunks[index] == digest:
+                continue
+            start, end = index * self.chunk_size, min((index + 1) * self.chunk_size, f_info.f_size)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        return Finding("ranges", f_info.f_path, "chunks", None, ranges) if ranges else None
+
+
+class CsvBaselineWriter:
+    """
+    write the verification file as csv, the first row is the hash function, the dates and the mode are
+    integer columns. with "state" of "checkpoint()", it continues a cut off file; with "compress", see
+    "open_compressed()".
+    """
+    def __init__(self, verification_file: str, hash_fuc: str, state: dict = None, compress: str = None,
+                 compress_level: int = None):
+        self.verification_file = verification_file
+        self.compress = compress
+        if state is None:
+            self.csv_file = open(verification_file, 'w') if compress is None else \
+                io.TextIOWrapper(open_compressed(verification_file, 'wb', compress, compress_level))
+            self.writer = csv.writer(self.csv_file)
+            self.writer.writerow([hash_fuc])  # write into the hash function
+        else:
+            self.csv_file = open(verification_file, 'r+')
+            self.csv_file.truncate(state["offset"])
+            self.csv_file.seek(state["offset"])
+            self.writer = csv.writer(self.csv_file)
+        self.sections = {}
+
+    def checkpoint(self) -> dict:
+        """
+        make the records written so far durable, the state to continue the file from.
+        """
+        self.csv_file.flush()
+        os.fsync(self.csv_file.fileno())
+        return {"offset": self.csv_file.tell()}
+
+    def written_records(self) -> Generator[FileInfo, any, None]:
+        """
+        the records written before the checkpoint of a continued file.
+        """
+        self.csv_file.flush()
+        with CsvBaselineReader(self.verification_file) as reader:
+            yield from reader
+
+    def write(self, f_info: FileInfo):
+        self.writer.writerow([f_info.f_path, f_info.f_size, f_info.user_name, f_info.group_name,
+                              f_info.access_right, None, f_info.message_digest,
+                              f_info.inode, f_info.device, f_info.ctime_ns, f_info.mtime_ns, f_info.fast_digest,
+                              f_info.link_target, f_info.f_mode])
+
+    def write_section(self, name: str, rows: list):
+        """
+        store a named table of extra rows after the records.
+        """
+        self.sections[name] = rows
+
+    def close(self):
+        if self.sections:
+            self.csv_file.flush()
+            trailer_offset = self.csv_file.tell() if self.compress is None else None
+            for name, rows in self.sections.items():
+                for row in rows:
+                    self.writer.writerow(["#" + name, *row])
+            # the trailer is for the seek to the tables, a compressed file is read through to them
+            if trailer_offset is not None:
+                self.writer.writerow([CSV_TRAILER, trailer_offset])
+        self.csv_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvBaselineReader:
+    """
+    read the verification file written by "CsvBaselineWriter", compressed with "compress",
+    which is then read as a stream.
+    """
+    def __init__(self, verification_file: str, compress: str = None):
+        self.verification_file = verification_file
+        self.compress = compress
+        self.csv_file = self.open()
+        self.reader = csv.reader(self.csv_file)
+        self.hash_fuc = next(self.reader)[0]
+        self.sections = None  # read on the first use, the cursors over the records do without them
+
+    def open(self):
+        return open(self.verification_file, 'r') if self.compress is None else \
+            io.TextIOWrapper(open_compressed(self.verification_file, 'rb', self.compress))
+
+    def read_sections(self) -> dict:
+        """
+        read the named tables of extra rows from the end of the file, the records are not read.
+        a compressed file can not seek to them, it is decompressed again as a stream and its records are skipped.
+        """
+        sections = {}
+        if self.compress is not None:
+            with self.open() as f:
+                for row in csv.reader(f):
+                    if row and row[0].startswith("#"):
+                        sections.setdefault(row[0][1:], []).append(row[1:])
+            return sections
+        with open(self.verification_file, 'rb') as f:
+            f_size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, f_size - 256))
+            last_rows = f.read().decode(errors='replace').splitlines()
+            last_row = next(csv.reader(last_rows[-1:]), [])
+            if len(last_row) != 2 or last_row[0] != CSV_TRAILER:
+                return sections
+            f.seek(int(last_row[1]))
+            for row in csv.reader(line.decode() for line in f):
+                if row[0] != CSV_TRAILER:
+                    sections.setdefault(row[0][1:], []).append(row[1:])
+        return sections
+
+    def read_section(self, name: str):
+        """
+        the named table of extra rows, None if the file has no such table.
+        """
+        if self.sections is None:
+            self.sections = self.read_sections()
+        return self.sections.get(name)
+
+    def reopen(self):
+        """
+        another reader of the records, which reads on its own, a compressed file is decompressed again.
+        """
+        return CsvBaselineReader(self.verification_file, self.compress)
+
+    def __iter__(self) -> Generator[FileInfo, any, None]:
+        for row in self.reader:
+            if row[0].startswith("#"):  # the records are over
+                break
+            yield FileInfo(*row)
+
+    def close(self):
+        self.csv_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BinaryBaselineWriter:
+    """
+    write the verification file in the binary format, names once in a string table, digests as raw bytes.
+    with "state" of "checkpoint()", it continues a cut off file; with "compress", see "open_compressed()".
+    """
+    def __init__(self, verification_file: str, hash_fuc: str, state: dict = None, compress: str = None,
+                 compress_level: int = None):
+        hash_name = hash_fuc.encode()
+        self.records_offset = HEADER_STRUCT.size + len(hash_name)
+        self.names = {}
+        self.offsets = array('Q')
+        self.sections = {}
+        if state is None:
+            self.db_file = open(verification_file, 'wb') if compress is None else \
+                open_compressed(verification_file, 'wb', compress, compress_level)
+            self.db_file.write(HEADER_STRUCT.pack(DB_MAGIC, DB_VERSION, len(hash_name)) + hash_name)
+            self.position = self.records_offset
+        else:
+            self.db_file = open(verification_file, 'r+b')
+            self.db_file.truncate(state["offset"])
+            self.db_file.seek(state["offset"])
+            self.position = state["offset"]
+            self.names = {name: name_id for name_id, name in enumerate(state["names"])}
+
+    def checkpoint(self) -> dict:
+        """
+        make the records written so far durable, the state to continue the file from.
+        """
+        self.db_file.flush()
+        os.fsync(self.db_file.fileno())
+        return {"offset": self.position, "names": list(self.names)}
+
+    def written_records(self) -> Generator[FileInfo, any, None]:
+        """
+        the records written before the checkpoint of a continued file.
+        """
+        end = self.db_file.tell()
+        names = list(self.names)
+        position = self.records_offset
+        while position < end:
+            self.db_file.seek(position)
+            self.offsets.append(position)
+            yield read_binary_record(self.db_file.read, names)
+            position = self.db_file.tell()
+        self.db_file.seek(end)
+
+    def name_id(self, name: str) -> int:
+        return self.names.setdefault(name, len(self.names))
+
+    def write(self, f_info: FileInfo):
+        path = os.fsencode(f_info.f_path)
+        digest = bytes.fromhex(f_info.message_digest) if f_info.message_digest else b''
+        fast_digest = bytes.fromhex(f_info.fast_digest) if f_info.fast_digest else b''
+        link_target = os.fsencode(f_info.link_target) if f_info.link_target else b''
+        self.offsets.append(self.position)
+        self.write_bytes(RECORD_STRUCT.pack(len(path), f_info.f_size, self.name_id(f_info.user_name),
+                                            self.name_id(f_info.group_name), f_info.f_mode,
+                                            f_info.mtime_ns, f_info.ctime_ns, f_info.inode,
+                                            f_info.device, len(digest), len(fast_digest), len(link_target))
+                         + path + digest + fast_digest + link_target)
+
+    def write_bytes(self, data: bytes):
+        self.db_file.write(data)
+        self.position += len(data)
+
+    def write_section(self, name: str, rows: list):
+        """
+        store a named table of extra rows after the index.
+        """
+        self.sections[name] = rows
+
+    def close(self):
+        names_offset = self.position
+        for name in self.names:  # dicts keep the insertion order, the order of the ids
+            name = name.encode()
+            self.write_bytes(NAME_STRUCT.pack(len(name)) + name)
+        index_offset = self.position
+        self.offsets.tofile(self.db_file)
+        sections_offset = self.position + len(self.offsets) * self.offsets.itemsize
+        for name, rows in self.sections.items():
+            name = name.encode()
+            self.db_file.write(NAME_STRUCT.pack(len(name)) + name + struct.pack("<Q", len(rows)))
+            for row in rows:
+                row = b"\0".join(os.fsencode(str(field)) for field in row)
+                self.db_file.write(SECTION_ROW_STRUCT.pack(len(row)) + row)
+        self.db_file.write(FOOTER_STRUCT.pack(names_offset, len(self.names), index_offset, len(self.offsets),
+                                              sections_offset, len(self.sections), DB_MAGIC))
+        self.db_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BinaryBaselineReader:
+    """
+    read the verification file written by "BinaryBaselineWriter", or "db_file" decompressed from it.
+    """
+    def __init__(self, verification_file: str, db_file=None):
+        self.verification_file = verification_file
+        self.db_file = open(verification_file, 'rb') if db_file is None else db_file
+        magic, version, name_len = HEADER_STRUCT.unpack(self.db_file.read(HEADER_STRUCT.size))
+        if magic != DB_MAGIC or version != DB_VERSION:
+            raise SivError(f"The verification file '{verification_file}' is not supported.")
+        self.hash_fuc = self.db_file.read(name_len).decode()
+        self.records_offset = self.db_file.tell()
+
+        self.db_file.seek(-FOOTER_STRUCT.size, os.SEEK_END)
+        names_offset, names_num, self.index_offset, self.records_num, sections_offset, sections_num, magic = \
+            FOOTER_STRUCT.unpack(self.db_file.read(FOOTER_STRUCT.size))
+        if magic != DB_MAGIC:
+            raise SivError(f"The verification file '{verification_file}' is truncated.")
+        self.names_offset = names_offset
+        self.db_file.seek(names_offset)
+        self.names = []
+        for _ in range(names_num):
+            name_len, = NAME_STRUCT.unpack(self.db_file.read(NAME_STRUCT.size))
+            self.names.append(self.db_file.read(name_len).decode())
+
+        self.db_file.seek(sections_offset)
+        self.sections = {}
+        for _ in range(sections_num):
+            name_len, = NAME_STRUCT.unpack(self.db_file.read(NAME_STRUCT.size))
+            name = self.db_file.read(name_len).decode()
+            rows_num, = struct.unpack("<Q", self.db_file.read(8))
+            rows = self.sections[name] = []
+            for _ in range(rows_num):
+                row_len, = SECTION_ROW_STRUCT.unpack(self.db_file.read(SECTION_ROW_STRUCT.size))
+                rows.append([os.fsdecode(field) for field in self.db_file.read(row_len).split(b"\0")])
+
+    def read_section(self, name: str):
+        """
+        the named table of extra rows, None if the file has no such table.
+        """
+        return self.sections.get(name)
+
+    def reopen(self):
+        """
+        another reader of the records, which reads on its own, a compressed file is not decompressed again.
+        """
+        return BinaryBaselineReader(self.verification_file, open(self.db_file.name, 'rb'))
+
+    def read_record(self, read) -> FileInfo:
+        return read_binary_record(read, self.names)
+
+    def __iter__(self) -> Generator[FileInfo, any, None]:
+        self.db_file.seek(self.records_offset)
+        while self.db_file.tell() < self.names_offset:
+            yield self.read_record(self.db_file.read)
+
+    def lookup(self, f_path: str):
+        """
+        binary search of the record of "f_path" with the index, None if there is no such record.
+        """
+        fd = self.db_file.fileno()
+        low, high = 0, self.records_num
+        while low < high:
+            middle = (low + high) // 2
+            offset, = struct.unpack("<Q", os.pread(fd, 8, self.index_offset + middle * 8))
+            path_len, = struct.unpack_from("<H", os.pread(fd, 2, offset))
+            middle_path = os.fsdecode(os.pread(fd, path_len, offset + RECORD_STRUCT.size))
+            if middle_path < f_path:
+                low = middle + 1
+            elif middle_path > f_path:
+                high = middle
+            else:
+                # the lengths of the digests and of the link target follow the fixed fields
+                lengths = RECORD_STRUCT.unpack(os.pread(fd, RECORD_STRUCT.size, offset))[9:]
+                record = os.pread(fd, RECORD_STRUCT.size + path_len + sum(lengths), offset)
+                position = 0
+
+                def read(size):
+                    nonlocal position
+                    position += size
+                    return record[position - size:position]
+                return self.read_record(read)
+        return None
+
+    def close(self):
+        self.db_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_binary_record(read, names: list) -> FileInfo:
+    """
+    read one record of the binary format with "read(size)" from the current position.
+    """
+    path_len, f_size, user_id, group_id, f_mode, mtime_ns, ctime_ns, inode, device, digest_len, fast_len, \
+        target_len = RECORD_STRUCT.unpack(read(RECORD_STRUCT.size))
+    f_path = os.fsdecode(read(path_len))
+    digest = read(digest_len).hex() if digest_len else None
+    fast_digest = read(fast_len).hex() if fast_len else None
+    link_target = os.fsdecode(read(target_len)) if target_len else None
+    f_info = FileInfo(f_path, f_size, names[user_id], names[group_id], None, None, digest,
+                      inode, device, ctime_ns, mtime_ns, fast_digest, link_target)
+    f_info.f_mode = f_mode
+    f_info.is_file = stat.S_ISREG(f_mode)
+    return f_info
+
+
+def compressed_format(file: str):
+    """
+    the compression of the file, detected from its first bytes, None if it is not compressed.
+    """
+    with open(file, 'rb') as f:
+        head = f.read(8)
+    for compress, magic in COMPRESS_MAGICS.items():
+        if head.startswith(magic):
+            return compress
+    return None
+
+
+def open_compressed(file: str, mode: str, compress: str, compress_level: int = None):
+    """
+    a binary stream which decompresses the file as it is read ('rb'), or compresses what is written to it
+    at "compress_level" ('wb'), with gzip, xz or zstd. the writes are buffered, the compressors are slow
+    with many small writes. the memory stays flat whatever the size of the file.
+    """
+    if compress == "zstd" and "zstd" not in COMPRESS_LISTS:
+        raise SivError(f"The file '{file}' is compressed with zstd, install zstandard.")
+    if compress_level is None:
+        compress_level = COMPRESS_LEVELS[compress][1]
+    if compress == "gzip":
+        import gzip
+        stream = gzip.open(file, mode, compresslevel=compress_level)
+    elif compress == "xz":
+        import lzma
+        stream = lzma.open(file, mode, preset=compress_level if mode == 'wb' else None)
+    else:
+        import zstandard
+        if mode == 'rb':
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file, 'rb'), closefd=True,
+                                                                                 read_across_frames=True),
+                                     DEFAULT_BUFFER_SIZE)
+        stream = zstandard.ZstdCompressor(level=compress_level).stream_writer(open(file, 'wb'), closefd=True)
+    return io.BufferedWriter(stream, DEFAULT_BUFFER_SIZE) if mode == 'wb' else stream
+
+
+def decompressed_file(file: str, compress: str):
+    """
+    the content of the compressed file in a temporary file, for the seeks and lookups of the binary format,
+    which can not be done in a compressed stream. the other readers of "reopen()" open it by its name,
+    it is removed when it is closed.
+    """
+    import shutil
+    import tempfile
+    db_file = tempfile.NamedTemporaryFile()
+    with open_compressed(file, 'rb', compress) as f:
+        shutil.copyfileobj(f, db_file, DEFAULT_BUFFER_SIZE)
+    db_file.seek(0)
+    return db_file
+
+
+def open_baseline(verification_file: str):
+    """
+    open the verification file for reading, the format and the compression are detected from its first bytes.
+    a compressed csv file is read as a stream, a compressed binary file is decompressed once into
+    a temporary file, which the readers of "reopen()" share, see "decompressed_file()".
+    """
+    compress = compressed_format(verification_file)
+    with open(verification_file, 'rb') if compress is None else \
+            open_compressed(verification_file, 'rb', compress) as f:
+        magic = f.read(len(DB_MAGIC))
+    if magic == DB_MAGIC:
+        if compress is None:
+            return BinaryBaselineReader(verification_file)
+        return BinaryBaselineReader(verification_file, decompressed_file(verification_file, compress))
+    return CsvBaselineReader(verification_file, compress)
+
+
+def create_baseline(verification_file: str, hash_fuc: str, db_format: str = "csv", state: dict = None,
+                    compress: str = None, compress_level: int = None):
+    """
+    create the verification file for writing in "db_format", compressed with "compress" at "compress_level",
+    or continue it from the "state" of a checkpoint, which a compressed file does not have.
+    """
+    if db_format == "binary":
+        return BinaryBaselineWriter(verification_file, hash_fuc, state, compress, compress_level)
+    return CsvBaselineWriter(verification_file, hash_fuc, state, compress, compress_level)
+
+
+class BaselineCursor:
+    """
+    look up the entries of the verification file of "baseline" in ascending path order,
+    it reads the verification file on its own, so it can run ahead of the comparison.
+    """
+    def __init__(self, baseline):
+        self.baseline = baseline.reopen()
+        self.records = iter(self.baseline)
+        self.current = next(self.records, FileInfo())
+
+    def close(self):
+        self.baseline.close()
+
+    def lookup(self, f_path: str):
+        while self.current and self.current.f_path < f_path:
+            self.current = next(self.records, FileInfo())
+        if self.current and self.current.f_path == f_path:
+            return self.current
+        return None
+
+    def trusted_digest(self, file_info: FileInfo):
+        """
+        the recorded digest of a file whose stat fingerprint is unchanged, otherwise None.
+        """
+        return unchanged_digest(self.lookup(file_info.f_path), file_info)
+
+
+def unchanged_digest(old_f_info, new_f_info: FileInfo):
+    """
+    the digest of "old_f_info" if the stat fingerprint of the file is unchanged, otherwise None.
+    """
+    if old_f_info is None or old_f_info.message_digest is None:
+        return None
+    fingerprint = new_f_info.fingerprint()
+    if fingerprint is None or fingerprint != old_f_info.fingerprint():
+        return None
+    return old_f_info.message_digest
+
+
+def is_sub_path(directory: str, file: str) -> bool:
+    """
+    check whether the location of the verification file and the report file are outside the monitored directory.
+    """
+    dir_path = os.path.abspath(directory)
+    file_path = os.path.abspath(file)
+
+    return file_path.startswith(dir_path)
+
+
+def may_overwrite(file: str, overwrite) -> bool:
+    """
+    whether "overwrite" allows to overwrite the existing "file", every file with True, or the files it lists.
+    """
+    return overwrite is True or (bool(overwrite) and file in overwrite)
+
+
+def valid_files_dirs(monitored_dir, verification_file: str, report_file: str, mode: str, resume: bool = False,
+                     overwrite=False):
+    """
+    valid files and directories in initialization mode and verification mode, an existing file is only
+    overwritten as "overwrite" allows, see "may_overwrite()", or continued with "resume".
+    """
+    dirs = monitored_dirs(monitored_dir)
+    for monitored_dir in dirs:
+        # dir exists?
+        if not os.path.exists(monitored_dir):
+            raise SivError(f"The path '{monitored_dir}' does not exist.")
+        if not os.path.isdir(monitored_dir):
+            raise SivError(f"The path '{monitored_dir}' is not a directory.")
+        # outside or inside?
+        if is_sub_path(monitored_dir, verification_file):
+            raise SivError("The validated file can not be in the monitored directory.")
+        if is_sub_path(monitored_dir, report_file):
+            raise SivError("The report file can not be in the monitored directory.")
+    # nested?
+    for parent, child in zip(dirs, dirs[1:]):
+        if child.startswith(parent + os.sep):
+            raise SivError(f"The monitored directory '{child}' is inside '{parent}'.")
+    # file exists?
+    if os.path.isdir(verification_file):
+        raise SivError("The verification file can not be a directory.")
+    if mode == "init" and os.path.isfile(verification_file) and not resume \
+            and not may_overwrite(verification_file, overwrite):
+        raise ExistingFileError(verification_file, "verification file")
+    if mode == "verif" and not os.path.isfile(verification_file):
+        raise SivError("The verification file does not exist.")
+    valid_report_file(report_file, resume and mode == "verif", overwrite)
+
+
+def valid_report_file(report_file: str, resume: bool = False, overwrite=False):
+    """
+    valid the report file, an existing one is overwritten if "overwrite" allows it, or continued with "resume".
+    """
+    if os.path.isdir(report_file):
+        raise SivError("The report file can not be a directory.")
+    if os.path.isfile(report_file) and not resume and not may_overwrite(report_file, overwrite):
+        raise ExistingFileError(report_file, "report file")
+
+
+def hexdigest(hash_obj) -> str:
+    """
+    the hex digest of "hash_obj", the shake functions give twice as many bits as their security strength.
+    """
+    if hash_obj.name.startswith("shake_"):
+        return hash_obj.hexdigest(int(hash_obj.name[len("shake_"):]) // 4)
+    return hash_obj.hexdigest()
+
+
+class Crc32:
+    """
+    CRC-32 of "zlib" with the interface of a hashlib object.
+    """
+    name = "crc32"
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self) -> str:
+        return f"{self.value:08x}"
+
+
+def new_hash(hash_fuc: str):
+    """
+    a new hash object of a function of "HASH_LISTS" or "FAST_HASH_LISTS".
+    """
+    if hash_fuc == "blake2b-64":
+        return hashlib.blake2b(digest_size=8)
+    if hash_fuc == "crc32":
+        return Crc32()
+    if hash_fuc in ("xxh64", "xxh3_64"):
+        import xxhash
+        return getattr(xxhash, hash_fuc)()
+    return hashlib.new(hash_fuc)
+
+
+class Throttle:
+    """
+    token buckets of the bytes and of the files per second read for hashing, 0 is no limit.
+    each process of a pool has its own copy, so the rates are divided by "shares".
+    """
+    def __init__(self, mb_per_second: float = 0, files_per_second: float = 0, shares: int = 1):
+        self.rates = (mb_per_second * 1e6 / shares, files_per_second / shares)
+        self.__setstate__(self.__dict__)
+
+    def __getstate__(self):
+        return {"rates": self.rates}
+
+    def __setstate__(self, state):
+        self.rates = state["rates"]
+        self.tokens = [0.0, 0.0]
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __bool__(self):
+        return any(self.rates)
+
+    def take(self, f_bytes: int = 0, files: int = 0) -> float:
+        """
+        take the tokens of a read, return the seconds slept.
+        """
+        with self.lock:
+            now = time.monotonic()
+            elapsed, self.last = now - self.last, now
+            wait = 0.0
+            for i, (rate, amount) in enumerate(zip(self.rates, (f_bytes, files))):
+                if rate:
+                    self.tokens[i] = min(rate, self.tokens[i] + elapsed * rate) - amount
+                    wait = max(wait, -self.tokens[i] / rate)
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+
+def set_priority(nice: int = 0, io_class: str = None):
+    """
+    lower the CPU priority of the process by "nice" and set its I/O class, "best-effort" at the lowest
+    level or "idle", before the workers are started, which inherit both.
+    the I/O class is for Linux only, and only the I/O schedulers BFQ and CFQ follow it.
+    """
+    if nice:
+        os.nice(nice)
+    if io_class is None:
+        return
+    import ctypes
+    import ctypes.util
+    import platform
+    syscall_number = IOPRIO_SET_SYSCALLS.get(platform.machine()) if platform.system() == "Linux" else None
+    if syscall_number is None:
+        logger.warning(f"The I/O class can not be set on {platform.system()} {platform.machine()}.")
+        return
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    # IOPRIO_WHO_PROCESS, the calling one, the class is in the bits above 13, the level 7 is the lowest
+    if libc.syscall(syscall_number, 1, 0, IOPRIO_CLASSES[io_class] << 13 | 7) < 0:
+        logger.warning(f"The I/O class can not be set: {os.strerror(ctypes.get_errno())}.")
+
+
+def chunk_pool(threads: int):
+    """
+    the thread pool which hashes the chunks of large files, shared by the hashing workers of the process,
+    so that several workers hashing large files at once run "threads" chunk threads in all, not each of them.
+    a forked process has none of the threads of its parent, and gets a pool of its own.
+    """
+    global _chunk_pool
+    from concurrent.futures import ThreadPoolExecutor
+    with _chunk_pool_lock:
+        if _chunk_pool is None or _chunk_pool[:2] != (os.getpid(), threads):
+            if _chunk_pool is not None and _chunk_pool[0] == os.getpid():
+                _chunk_pool[2].shutdown(wait=False)
+            _chunk_pool = (os.getpid(), threads, ThreadPoolExecutor(max_workers=threads))
+        return _chunk_pool[2]
+
+
+def open_regular(file_path: str, follow_symlinks: bool = False, file_id: tuple = None) -> tuple:
+    """
+    open a regular file unbuffered, without following a link unless "follow_symlinks", without blocking
+    and without updating its access time where allowed. the file and its stat, (None, None) if it is gone,
+    not a regular file or no longer the (device, inode) "file_id".
+    """
+    flags = os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC | (0 if follow_symlinks else os.O_NOFOLLOW)
+    noatime = getattr(os, "O_NOATIME", 0)  # Linux only
+    try:
+        try:
+            fd = os.open(file_path, flags | noatime)
+        except PermissionError:  # only the owner of the file may ask for no access time
+            if not noatime:
+                raise
+            fd = os.open(file_path, flags)
+    except OSError as e:
+        # a symbolic link, EMLINK on FreeBSD, or removed
+        if e.errno in (errno.ELOOP, errno.EMLINK, errno.ENOENT, errno.ENOTDIR):
+            return None, None
+        raise
+    file_stat = os.fstat(fd)
+    if not stat.S_ISREG(file_stat.st_mode) or \
+            file_id is not None and (file_stat.st_dev, file_stat.st_ino) != file_id:
+        os.close(fd)
+        return None, None
+    return open(fd, mode='rb', buffering=0), file_stat
+
+
+def chunked_digest(hash_fuc: str, chunk_digests: list) -> str:
+    """
+    the digest of a file of chunk digests, computed over the digests of its chunks.
+    """
+    hash_obj = new_hash(hash_fuc)
+    hash_obj.update("\n".join(chunk_digests).encode())
+    return hexdigest(hash_obj)
+
+
+def chunks_num(f_size: int, chunk_size: int) -> int:
+    return -(-f_size // chunk_size)
+
+
+class Hasher:
+    """
+    get the checksums of files with "hash_fuc", read by "io_mode" (see "IO_LISTS"), the fast digest of
+    "fast_fuc" and the chunk digests of the large files; with "fast_fuc", "hash_fuc" is only computed for one
+    file in "deep_period" of them every day, see "is_deep()". it is pickled to the workers of the process pool.
+    """
+    def __init__(self, hash_fuc: str, io_mode: str = "readinto", buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 fast_fuc: str = None, deep_period: int = DEEP_PERIOD, chunk_size: int = 0,
+                 chunk_threshold: int = CHUNK_THRESHOLD, chunk_jobs: int = 1, throttle: Throttle = None,
+                 drop_cache: bool = False, follow_symlinks: bool = False):
+        self.hash_fuc = hash_fuc
+        self.io_mode = io_mode
+        self.buffer_size = buffer_size
+        self.fast_fuc = fast_fuc
+        self.deep_period = deep_period
+        self.chunk_size = chunk_size
+        self.chunk_threshold = max(chunk_threshold, 1)  # an empty file has no chunk
+        self.chunk_jobs = chunk_jobs
+        self.throttle = throttle or None
+        self.drop_cache = drop_cache
+        self.follow_symlinks = follow_symlinks
+        self.day = int(time.time() // 86400)  # fixed for the run
+
+    def is_deep(self, file_path: str) -> bool:
+        """
+        whether the file gets the digest of "hash_fuc" in this run.
+        """
+        if self.fast_fuc is None or self.deep_period == 1:
+            return True
+        if not self.deep_period:
+            return False
+        return zlib.crc32(os.fsencode(file_path)) % self.deep_period == self.day % self.deep_period
+
+    def hash_file(self, file_path: str, metrics: Metrics = None, file_id: tuple = None) -> str:
+        """
+        get the checksum of a single file with "hash_fuc".
+        """
+        return self.read_digests(file_path, [self.hash_fuc], metrics, file_id)[0][0]
+
+    def hash_tiers(self, file_path: str, metrics: Metrics = None, file_id: tuple = None) -> tuple:
+        """
+        get the checksum, the fast digest and the chunk digests of a single file,
+        any of them is None if it is not computed.
+        """
+        if metrics is None:
+            metrics = NULL_METRICS
+        if self.fast_fuc is None:
+            digests, chunks = self.read_digests(file_path, [self.hash_fuc], metrics, file_id)
+            return digests[0], None, chunks
+        if self.is_deep(file_path):
+            metrics.count("deep_files")
+            digests, chunks = self.read_digests(file_path, [self.hash_fuc, self.fast_fuc], metrics, file_id)
+            return digests[0], digests[1], chunks
+        metrics.count("fast_only_files")
+        return None, self.read_digests(file_path, [self.fast_fuc], metrics, file_id)[0][0], None
+
+    def read_digests(self, file_path: str, hash_fucs: list, metrics: Metrics = None, file_id: tuple = None) -> tuple:
+        """
+        read a single file once, and get its checksums with every function of "hash_fucs", and the chunk
+        digests of the first one if the file is hashed in chunks. None if it is no longer the file "file_id".
+        """
+        if metrics is None:
+            metrics = NULL_METRICS
+        clock = metrics.clock
+        throttle = self.throttle
+        if throttle is not None:
+            metrics.add_time("throttle", throttle.take(files=1))
+        start_time = clock()
+        hash_objs = [new_hash(hash_fuc) for hash_fuc in hash_fucs]
+        f, file_stat = open_regular(file_path, self.follow_symlinks, file_id)
+        if f is None:  # no digest of what replaced the file
+            metrics.count("replaced_files")
+            return [None] * len(hash_fucs), None
+        with f:
+            fd = f.fileno()
+            f_size = file_stat.st_size
+            if f_size > self.buffer_size and hasattr(os, "posix_fadvise"):  # tell the kernel to read ahead
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            io_mode = self.io_mode
+            if io_mode == "auto":
+                io_mode = "mmap" if f_size >= MMAP_THRESHOLD and not throttle else "readinto"
+            chunked = self.chunk_size and f_size >= self.chunk_threshold
+            read_time = hash_time = throttle_time = 0.0
+            open_time = clock()
+            if throttle is not None and io_mode != "readinto" and not chunked:
+                throttle_time = throttle.take(f_size)  # the whole file is read at once
+                open_time = clock()
+            chunks = None
+
+            if chunked:
+                # the chunk digests of every function of "hash_fucs"
+                chunks = list(zip(*self.hash_chunks(fd, f_size, hash_fucs,
+                                                    range(chunks_num(f_size, self.chunk_size)))))
+                hash_time = clock() - open_time
+            elif io_mode == "mmap" and f_size:  # an empty file can not be mapped
+                # a mapped file cut short by a writer raises SIGBUS, mmap is only for trees which do not change
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    for hash_obj in hash_objs:
+                        hash_obj.update(mm)
+                hash_time = clock() - open_time
+            elif io_mode == "file_digest" and hasattr(hashlib, "file_digest") and len(hash_fucs) == 1:
+                hash_objs = [hashlib.file_digest(f, lambda: new_hash(hash_fucs[0]))]
+                hash_time = clock() - open_time
+            elif metrics.timed:
+                buffer = self.buffer()
+                view = memoryview(buffer)
+                while True:
+                    read_start = clock()
+                    size = f.readinto(buffer)
+                    hash_start = clock()
+                    read_time += hash_start - read_start
+                    if not size:
+                        break
+                    for hash_obj in hash_objs:
+                        hash_obj.update(view[:size])
+                    hash_time += clock() - hash_start
+                    if throttle is not None:
+                        throttle_time += throttle.take(size)
+            else:  # the same loop without the clock
+                buffer = self.buffer()
+                view = memoryview(buffer)
+                size = f.readinto(buffer)
+                while size:
+                    for hash_obj in hash_objs:
+                        hash_obj.update(view[:size])
+                    if throttle is not None:
+                        throttle.take(size)
+                    size = f.readinto(buffer)
+            if self.drop_cache and hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+        if metrics.timed:
+            # the waits of the throttle are left out of the other phases and of the latency
+            metrics.add_time("file_open", open_time - start_time - (0 if io_mode == "readinto" else throttle_time))
+            metrics.add_time("throttle", throttle_time)
+            metrics.add_time("read", read_time)
+            metrics.add_time("hash", hash_time)
+            metrics.observe_latency(clock() - start_time - throttle_time)
+        metrics.count("hashed_files")
+        metrics.count("hashed_bytes", f_size)
+        if chunks is not None:
+            return [chunked_digest(hash_fuc, digests) for hash_fuc, digests in zip(hash_fucs, chunks)], \
+                list(chunks[0])
+        return [hexdigest(hash_obj) for hash_obj in hash_objs], None
+
+    def hash_chunks(self, fd: int, f_size: int, hash_fucs: list, indexes) -> list:
+        """
+        the digests of the chunks "indexes" of an open file, a list of every function of "hash_fucs" per chunk,
+        read with "preadv()" by the threads of "chunk_pool()" in parallel, not mapped as these files may be written.
+        """
+        def hash_chunk(index):
+            start = index * self.chunk_size
+            end = min(start + self.chunk_size, f_size)
+            if self.throttle is not None:
+                self.throttle.take(end - start)
+            hash_objs = [new_hash(hash_fuc) for hash_fuc in hash_fucs]
+            buffer = self.buffer()
+            view = memoryview(buffer)
+            while start < end:
+                size = os.preadv(fd, [view[:min(len(buffer), end - start)]], start)
+                if not size:
+                    break
+                for hash_obj in hash_objs:
+                    hash_obj.update(view[:size])
+                start += size
+            return [hexdigest(hash_obj) for hash_obj in hash_objs]
+
+        if self.chunk_jobs <= 1 or len(indexes) <= 1:
+            return [hash_chunk(index) for index in indexes]
+        return list(chunk_pool(self.chunk_jobs).map(hash_chunk, indexes))
+
+    def process_share(self, processes: int):
+        """
+        the hasher of each of the workers of a pool of "processes", which share the chunk threads among them.
+        """
+        import copy
+        hasher = copy.copy(self)
+        hasher.chunk_jobs = max(1, self.chunk_jobs // processes)
+        return hasher
+
+    def buffer(self) -> bytearray:
+        """
+        the read buffer of the current thread, allocated once.
+        """
+        buffer = getattr(_thread_buffers, "buffer", None)
+        if buffer is None or len(buffer) != self.buffer_size:
+            buffer = _thread_buffers.buffer = bytearray(self.buffer_size)
+        return buffer
+
+    def hash_files(self, files: list, timed: bool = True) -> tuple:
+        """
+        get the checksums, fast digests and chunk digests of a batch of (path, file_id) files,
+        one task of the hashing pool, together with the metrics of the batch, "timed" as the ones of the run.
+        """
+        metrics = Metrics(timed)
+        return [self.hash_tiers(file_path, metrics, file_id) for file_path, file_id in files], metrics
+
+
+class ChunkSampler:
+    """
+    the quick check of the files of chunk digests: only "samples_num" chunks picked at random are hashed,
+    and the digest of the file is computed over the stored digests of the others.
+    """
+    def __init__(self, chunk_digests: ChunkDigests, hasher: Hasher, samples_num: int,
+                 trusted_digest=None, metrics: Metrics = None):
+        import random
+        self.chunk_digests = chunk_digests
+        self.hasher = hasher
+        self.samples_num = samples_num
+        self.trusted = trusted_digest
+        self.metrics = metrics if metrics is not None else Metrics(timed=False)
+        self.random = random.SystemRandom()
+
+    def trusted_digest(self, file_info: FileInfo):
+        digest = self.trusted(file_info) if self.trusted is not None else None
+        old_chunks = self.chunk_digests.digests.get(file_info.f_path)
+        if digest is not None or old_chunks is None:
+            return digest
+        chunk_size = self.chunk_digests.chunk_size
+        f, file_stat = open_regular(file_info.f_path, self.hasher.follow_symlinks, file_info.file_id())
+        if f is None:
+            return None
+        with f:
+            f_size = file_stat.st_size
+            if f_size != file_info.f_size or chunks_num(f_size, chunk_size) != len(old_chunks):
+                return None
+            indexes = sorted(self.random.sample(range(len(old_chunks)), min(self.samples_num, len(old_chunks))))
+            with self.metrics.timer("hash"):
+                digests = self.hasher.hash_chunks(f.fileno(), f_size, [self.hasher.hash_fuc], indexes)
+        chunks = list(old_chunks)
+        for index, (chunk_digest,) in zip(indexes, digests):
+            chunks[index] = chunk_digest
+        file_info.chunks = chunks
+        self.metrics.count("sampled_files")
+        self.metrics.count("sampled_chunks", len(indexes))
+        return chunked_digest(self.hasher.hash_fuc, chunks)
+
+
+def scan_dir(path: str, metrics: Metrics = None, rules: Rules = None) -> Generator[os.DirEntry, any, None]:
+    """
+    use "os.scandir()" to traverse "path" recursively, in the sorted order of the whole paths, with one
+    listing per level in memory; a directory is listed both as "name" and as "name/", where its content sorts.
+    the entries which "rules" does not keep are left out, and counted in "metrics".
+    """
+    start_time = time.perf_counter()
+    follow_symlinks = rules is not None and rules.follow_symlinks
+    try:
+        with os.scandir(path) as it:
+            listing = []
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                except OSError:
+                    is_dir = False
+                if rules and not rules.keep(entry.path, entry.name, is_dir):
+                    continue
+                if not rules or rules.in_range(entry.path):
+                    listing.append((entry.name, entry, False, is_dir))
+                # like "os.walk()", do not descend into symbolic links to directories
+                if is_dir and not entry.is_symlink() and (not rules or rules.descend(entry.path)):
+                    listing.append((entry.name + os.sep, entry, True, is_dir))
+    except OSError:  # like "os.walk()", skip the directories which can not be listed
+        return
+
+    listing.sort(key=lambda item: item[0])
+    if metrics is not None:
+        metrics.add_time("enumeration", time.perf_counter() - start_time)
+    for _, entry, descend, is_dir in listing:
+        if descend:
+            yield from scan_dir(entry.path, metrics, rules)
+        else:
+            if metrics is not None:
+                metrics.count("dirs" if is_dir else "files")
+            yield entry
+
+
+def scan_dirs(path, metrics: Metrics = None, rules: Rules = None) -> Generator[os.DirEntry, any, None]:
+    """
+    "scan_dir()" of one or several directories, in the sorted order of the whole paths.
+    """
+    for monitored_dir in monitored_dirs(path):
+        if not rules or rules.descend(monitored_dir):
+            yield from scan_dir(monitored_dir, metrics, rules)
+
+
+def collect_dir(path, resolver: NameResolver, metrics: Metrics = None,
+                rules: Rules = None) -> Generator[FileInfo, any, None]:
+    """
+    use "scan_dirs()" and the cached "DirEntry.stat()" to collect the "FileInfo" of the entries,
+    without the checksum; an entry removed since its directory was listed is left out.
+    """
+    if metrics is None:
+        metrics = Metrics(timed=False)
+    clock = metrics.clock
+    follow_symlinks = rules is not None and rules.follow_symlinks
+    for entry in scan_dirs(path, metrics, rules):
+        start_time = clock()
+        file_stat = stat_path(entry, follow_symlinks)
+        metrics.add_time("stat", clock() - start_time)
+        if file_stat is None:
+            metrics.count("vanished_files")
+            continue
+
+        file_info = stat_info(entry.path, file_stat, resolver, metrics)
+        if rules:
+            file_info.checks = rules.attributes(entry.path)
+        yield file_info
+
+
+def stat_path(path, follow_symlinks: bool = False) -> os.stat_result:
+    """
+    "os.lstat()" of a path or a "DirEntry", or "os.stat()" with "follow_symlinks",
+    a dangling symbolic link or a loop of them is then taken as the link itself.
+    None if the path no longer exists.
+    """
+    stat_fuc = path.stat if isinstance(path, os.DirEntry) else lambda **kwargs: os.stat(path, **kwargs)
+    if follow_symlinks:
+        try:
+            return stat_fuc()
+        except OSError:
+            pass
+    try:
+        return stat_fuc(follow_symlinks=False)
+    except (FileNotFoundError, NotADirectoryError):  # removed, or a directory above it was replaced
+        return None
+
+
+def stat_info(f_path: str, file_stat: os.stat_result, resolver: NameResolver, metrics: Metrics = None) -> FileInfo:
+    """
+    store the result of "os.stat()" in the class "FileInfo", without the checksum,
+    with the target of a symbolic link.
+    """
+    file_info = FileInfo()
+    file_info.f_path = f_path
+    file_info.f_size = file_stat.st_size
+    clock = metrics.clock if metrics is not None else no_clock
+    start_time = clock()
+    file_info.user_name = resolver.user_name(file_stat.st_uid)
+    file_info.group_name = resolver.group_name(file_stat.st_gid)
+    if metrics is not None:
+        metrics.add_time("owner_lookup", clock() - start_time)
+    # the access right and the modification date follow from "f_mode" and "mtime_ns" when needed
+    file_info.inode = file_stat.st_ino
+    file_info.device = file_stat.st_dev
+    file_info.ctime_ns = file_stat.st_ctime_ns
+    file_info.mtime_ns = file_stat.st_mtime_ns
+    file_info.f_mode = file_stat.st_mode
+    file_info.is_file = stat.S_ISREG(file_stat.st_mode)
+    file_info.links = file_stat.st_nlink
+    if stat.S_ISLNK(file_stat.st_mode):
+        try:
+            file_info.link_target = os.readlink(f_path)
+        except OSError:  # replaced in the meantime
+            pass
+    return file_info
+
+
+def collect_dir_trusted(path, resolver: NameResolver, trusted_digest=None,
+                        metrics: Metrics = None, rules: Rules = None) -> Generator[FileInfo, any, None]:
+    """
+    "collect_dir()", taking the digests of unchanged files from "trusted_digest(file_info)".
+    those files, and the files whose digest is not checked, are marked as not to be hashed.
+    """
+    for file_info in collect_dir(path, resolver, metrics, rules):
+        yield mark_to_hash(file_info, trusted_digest, metrics)
+
+
+def mark_to_hash(file_info: FileInfo, trusted_digest=None, metrics: Metrics = None) -> FileInfo:
+    """
+    take the digest of an unchanged file from "trusted_digest(file_info)", counted in "metrics",
+    mark the file as to be hashed if it has none and its digest is checked.
+    """
+    checked = "digest" in file_info.checks
+    if file_info.is_file and checked and trusted_digest is not None:
+        file_info.message_digest = trusted_digest(file_info)
+        if file_info.message_digest is not None and metrics is not None:
+            metrics.count("trusted_files")
+    file_info.to_hash = file_info.is_file and checked and file_info.message_digest is None
+    return file_info
+
+
+def stat_entries(entries: list, follow_symlinks: bool = False, clock=time.perf_counter) -> list:
+    """
+    "stat_path()" of a batch of entries, with the time of each call by "clock".
+    """
+    results = []
+    for entry in entries:
+        start_time = clock()
+        file_stat = stat_path(entry, follow_symlinks)
+        results.append((entry.path, file_stat, clock() - start_time))
+    return results
+
+
+def traverse_dir(path, hasher: Hasher, jobs: int = 1, backend: str = "thread",
+                 trusted_digest=None, resolver: NameResolver = None,
+                 metrics: Metrics = None, rules: Rules = None,
+                 pipeline: str = "pool") -> Generator[FileInfo, any, None]:
+    """
+    collect and hash the files and directories under "path" in sorted path order, with "jobs" workers of
+    a thread or process pool, or the "async" pipeline of "traverse_dir_async()"; a hard linked inode is
+    hashed once, see "LinkDedup".
+    """
+    if resolver is None:
+        resolver = NameResolver()
+    if metrics is None:
+        metrics = Metrics(timed=False)
+
+    if pipeline == "async":
+        yield from traverse_dir_async(path, hasher, jobs, backend, trusted_digest, resolver, metrics, rules)
+        return
+
+    links = LinkDedup(hasher, metrics)
+    if jobs <= 1:
+        for file_info in collect_dir_trusted(path, resolver, trusted_digest, metrics, rules):
+            if links.mark(file_info).to_hash:
+                file_info.message_digest, file_info.fast_digest, file_info.chunks = \
+                    hasher.hash_tiers(file_info.f_path, metrics, file_info.file_id())
+            yield links.fill(file_info)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    # a process task costs a round trip of pickling, so send the files in batches
+    batch_size = 1 if backend == "thread" else HASH_BATCH_SIZE
+    pool_type = ThreadPoolExecutor if backend == "thread" else ProcessPoolExecutor
+    # finished batches are held back until all the batches before them are done,
+    # bound the number of batches in flight to keep the memory flat
+    max_pending = jobs * 4
+
+    pool_hasher = hasher.process_share(jobs) if backend == "process" else hasher
+
+    with pool_type(max_workers=jobs) as pool:
+        pending = deque()
+        batch = []
+
+        def submit(entries):
+            files = [(e.f_path, e.file_id()) for e in entries if e.to_hash]
+            pending.append((entries, pool.submit(pool_hasher.hash_files, files, metrics.timed)))
+
+        def finish():
+            entries, future = pending.popleft()
+            digests, batch_metrics = future.result()
+            metrics.merge(batch_metrics)
+            digests = iter(digests)
+            for e in entries:
+                if e.to_hash:
+                    e.message_digest, e.fast_digest, e.chunks = next(digests)
+                links.fill(e)
+            return entries
+
+        for file_info in collect_dir_trusted(path, resolver, trusted_digest, metrics, rules):
+            batch.append(links.mark(file_info))
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+                if len(pending) >= max_pending:
+                    yield from finish()
+        if batch:
+            submit(batch)
+        while pending:
+            yield from finish()
+
+
+def compare_changes(old_f_info, new_f_info, checks: frozenset = ALL_ATTRIBUTES) -> list:
+    """
+    the findings about the changes from "old_f_info" to "new_f_info" of the same path, one of them empty
+    for a created or deleted file; only the attributes in "checks" are compared.
+    """
+    # File is deleted
+    if old_f_info and not new_f_info:
+        return [Finding("deleted", old_f_info.f_path)]
+    # File is created
+    if new_f_info and not old_f_info:
+        return [Finding("created", new_f_info.f_path)]
+    if not old_f_info and not new_f_info:
+        return []
+
+    findings = []
+    path = old_f_info.f_path
+    # different size
+    if "size" in checks and old_f_info.f_size != new_f_info.f_size:
+        findings.append(Finding("changed", path, "size", old_f_info.f_size, new_f_info.f_size))
+    # different user
+    if "user" in checks and old_f_info.user_name != new_f_info.user_name:
+        findings.append(Finding("changed", path, "user", old_f_info.user_name, new_f_info.user_name))
+    # different group
+    if "group" in checks and old_f_info.group_name != new_f_info.group_name:
+        findings.append(Finding("changed", path, "group", old_f_info.group_name, new_f_info.group_name))
+    # different access right, the modes are compared as integers if both are known
+    if "mode" in checks and (old_f_info.f_mode != new_f_info.f_mode if old_f_info.f_mode is not None
+                             and new_f_info.f_mode is not None
+                             else old_f_info.access_right != new_f_info.access_right):
+        findings.append(Finding("changed", path, "mode", old_f_info.access_right, new_f_info.access_right))
+    # different modification date, in nanoseconds,
+    # or to the second in the local time against a verification file of an older version
+    if "date" in checks:
+        if old_f_info.mtime_ns is not None and new_f_info.mtime_ns is not None:
+            if old_f_info.mtime_ns != new_f_info.mtime_ns:
+                findings.append(Finding("changed", path, "date", old_f_info.modified_date,
+                                        new_f_info.modified_date))
+        elif old_f_info.asctime() != new_f_info.asctime():
+            findings.append(Finding("changed", path, "date", old_f_info.asctime(), new_f_info.asctime()))
+    # different fast digest, when only that one is computed
+    if "digest" in checks and new_f_info.message_digest is None and new_f_info.fast_digest is not None:
+        if old_f_info.fast_digest != new_f_info.fast_digest:
+            findings.append(Finding("changed", path, "fast_digest", old_f_info.fast_digest, new_f_info.fast_digest))
+    # different digest
+    elif "digest" in checks and old_f_info.message_digest != new_f_info.message_digest:
+        findings.append(Finding("changed", path, "digest", old_f_info.message_digest, new_f_info.message_digest))
+    # different target of a symbolic link, its content
+    if "digest" in checks and old_f_info.link_target != new_f_info.link_target:
+        findings.append(Finding("changed", path, "target", old_f_info.link_target, new_f_info.link_target))
+    return findings
+
+
+def format_finding(finding: Finding) -> str:
+    """
+    a finding as a line of the text report.
+    """
+    if finding.kind == "changed":
+        return (f"{WARNING_TITLES[finding.attribute]} changed: '{finding.path}', "
+                f"{WARNING_INDENT}'{finding.old}' -> '{finding.new}'.\n")
+    if finding.kind == "split":
+        groups = "' | '".join(", ".join(group) for group in finding.new)
+        return f"Hard link set split: '{finding.path}', {WARNING_INDENT}'{', '.join(finding.old)}' -> '{groups}'.\n"
+    if finding.kind == "ranges":
+        ranges = ", ".join(f"{start}-{end - 1}" for start, end in finding.new)
+        return f"Byte ranges changed: '{finding.path}', {WARNING_INDENT}'{ranges}'.\n"
+    return f"{finding.kind.capitalize()}: '{finding.path}'.\n"
+
+
+def compare_file_info(old_f_info, new_f_info, checks: frozenset = ALL_ATTRIBUTES) -> list:
+    """
+    the warnings about the changes from "old_f_info" to "new_f_info" of the same path,
+    as the lines of the text report, see "compare_changes()".
+    """
+    return [format_finding(finding) for finding in compare_changes(old_f_info, new_f_info, checks)]
+
+
+class TextReportWriter:
+    """
+    write the report as text, a line per warning and per summary entry, in bulk or with "line_buffered"
+    at once; with "offset", it continues a report cut off after a checkpoint.
+    """
+    def __init__(self, report_file: str, label_width: int, line_buffered: bool = False, offset: int = None):
+        buffering = 1 if line_buffered else DEFAULT_BUFFER_SIZE
+        if offset is None:
+            self.report_file = open(report_file, 'w', buffering=buffering)
+        else:
+            self.report_file = open(report_file, 'r+', buffering=buffering)
+            self.report_file.truncate(offset)
+            self.report_file.seek(offset)
+        self.label_width = label_width
+        self.batch_size = 1 if line_buffered else REPORT_BATCH_SIZE
+        self.lines = []
+
+    def write(self, line: str):
+        self.lines.append(line)
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.report_file.writelines(self.lines)
+        self.lines.clear()
+
+    def checkpoint(self) -> int:
+        """
+        make the lines written so far durable, the offset to continue the report from.
+        """
+        self.flush()
+        self.report_file.flush()
+        os.fsync(self.report_file.fileno())
+        return self.report_file.tell()
+
+    def finding(self, finding: Finding, time_ns: int = None):
+        line = format_finding(finding)
+        self.write(line if time_ns is None else f"[{time.asctime(time.localtime(time_ns // 10 ** 9))}] {line}")
+
+    def summary(self, entries: list):
+        """
+        the summary, a list of (key, label, value).
+        """
+        for key, label, value in entries:
+            if key == "name_lookups":
+                value = f"'{value[0]}' resolved, '{value[1]}' cached"
+            elif key == "throughput":
+                value = f"'{value[0]}' MB/s, '{value[1]}' files/s"
+            elif key == "total_time":
+                value = f"'{round(value, 6)}' seconds"
+            elif isinstance(value, list):
+                value = "'" + "', '".join(value) + "'"
+            else:
+                value = f"'{value}'"
+            self.write(f"{label + ':':<{self.label_width}}{value}.\n")
+
+    def close(self):
+        self.flush()
+        self.report_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonLinesReportWriter(TextReportWriter):
+    """
+    write the report as JSON Lines, an object per finding with its type, path, attribute, old and new value,
+    and an object of type "summary" at the end, for the log collectors.
+    """
+    def __init__(self, report_file: str, label_width: int, line_buffered: bool = False, offset: int = None):
+        import json
+        super().__init__(report_file, label_width, line_buffered, offset)
+        self.dumps = json.dumps
+
+    def finding(self, finding: Finding, time_ns: int = None):
+        self.write(self.dumps(finding_record(finding, time_ns)) + "\n")
+
+    def summary(self, entries: list):
+        record = {"type": "summary"}
+        for key, _, value in entries:
+            if key == "name_lookups":
+                value = {"resolved": value[0], "cached": value[1]}
+            elif key == "throughput":
+                value = {"mb_per_second": value[0], "files_per_second": value[1]}
+            elif key == "total_time":
+                value = round(value, 6)
+            record[key] = value
+        self.write(self.dumps(record) + "\n")
+
+
+def finding_record(finding: Finding, time_ns: int = None) -> dict:
+    """
+    a finding as an object of the JSON Lines report.
+    """
+    record = {"type": finding.kind, "path": finding.path}
+    if finding.attribute is not None:
+        record.update(attribute=finding.attribute, old=finding.old, new=finding.new)
+    if time_ns is not None:
+        record["time"] = format_time_ns(time_ns)
+    return record
+
+
+def create_report(report_file: str, report_format: str = "text", label_width: int = 44,
+                  line_buffered: bool = False, offset: int = None):
+    """
+    create the report file for writing in "report_format", or continue it from "offset".
+    """
+    if report_format == "jsonl":
+        return JsonLinesReportWriter(report_file, label_width, line_buffered, offset)
+    return TextReportWriter(report_file, label_width, line_buffered, offset)
+
+
+def throughput(metrics: Metrics, total_time: float) -> tuple:
+    """
+    the MB and the files hashed per second of the run.
+    """
+    total_time = max(total_time, 1e-9)
+    return (round(metrics.counters.get("hashed_bytes", 0) / 1e6 / total_time, 1),
+            round(metrics.counters.get("hashed_files", 0) / total_time, 1))
+
+
+def write_metrics(metrics: Metrics, report_file: str, metrics_format: str, resolver: NameResolver,
+                  total_time: float, warnings_num: int = 0):
+    """
+    add the counters of the run to "metrics" and write them next to the report file.
+    """
+    for name in ("dirs", "files", "trusted_files"):  # written even when nothing is counted
+        metrics.count(name, 0)
+    metrics.count("warnings", warnings_num)
+    metrics.count("name_lookups_resolved", resolver.misses)
+    metrics.count("name_lookups_cached", resolver.hits)
+    metrics.seconds["total"] = total_time
+    metrics_file = metrics_path(report_file, metrics_format)
+    metrics.write(metrics_file, metrics_format)
+    logger.info(f"The metrics file is stored in the '{os.path.abspath(metrics_file)}'.")
+
+
+def traverse_dir_async(path, hasher: Hasher, jobs: int, backend: str, trusted_digest, resolver: NameResolver,
+                       metrics: Metrics, rules: Rules) -> Generator[FileInfo, any, None]:
+    """
+    "traverse_dir()" as asyncio stages connected by bounded queues: walk, stat, collect and emit, so that
+    the waits of the walk, the stats and the reads overlap, e.g. on network file systems. each thread fills its
+    own metrics, merged into "metrics" at the end.
+    """
+    import asyncio
+    import queue
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+    from itertools import islice
+
+    out_queue = queue.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    walk_metrics = Metrics(metrics.timed)
+    stage_metrics = Metrics(metrics.timed)
+    links = LinkDedup(hasher, stage_metrics)
+    stopped = threading.Event()  # set when this generator is closed early
+    end = object()
+
+    def hand_over(items):
+        for item in items:
+            while not stopped.is_set():
+                try:
+                    out_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        walk_pool = ThreadPoolExecutor(max_workers=1)
+        stat_pool = ThreadPoolExecutor(max_workers=max(jobs, 2))
+        hash_pool = (ThreadPoolExecutor if backend == "thread" else ProcessPoolExecutor)(max_workers=jobs)
+        pool_hasher = hasher.process_share(jobs) if backend == "process" else hasher
+        stat_queue = asyncio.Queue(maxsize=max(2, ASYNC_QUEUE_SIZE // ASYNC_BATCH_SIZE))
+        # batches of files for a process pool, as in "traverse_dir()"
+        batch_size = 1 if backend == "thread" else HASH_BATCH_SIZE
+        order_queue = asyncio.Queue(maxsize=max(2, ASYNC_QUEUE_SIZE // batch_size))
+        entries = scan_dirs(path, walk_metrics, rules)
+
+        async def walk():
+            while not stopped.is_set():
+                batch = await loop.run_in_executor(walk_pool, lambda: list(islice(entries, ASYNC_BATCH_SIZE)))
+                if not batch:
+                    break
+                await stat_queue.put(loop.run_in_executor(stat_pool, stat_entries, batch,
+                                                          rules is not None and rules.follow_symlinks,
+                                                          stage_metrics.clock))
+            await stat_queue.put(None)
+
+        async def send(group, files):
+            hashing = loop.run_in_executor(hash_pool, pool_hasher.hash_files, files, stage_metrics.timed) \
+                if files else None
+            await order_queue.put((group, hashing))
+
+        async def collect():
+            while True:
+                stats = await stat_queue.get()
+                if stats is None:
+                    break
+                # the entries of a stat batch in groups, each one up to the "batch_size"-th file to hash
+                group, files = [], []
+                for f_path, file_stat, stat_time in await stats:
+                    stage_metrics.add_time("stat", stat_time)
+                    if file_stat is None:  # removed since its directory was listed
+                        stage_metrics.count("vanished_files")
+                        continue
+                    file_info = stat_info(f_path, file_stat, resolver, stage_metrics)
+                    if rules:
+                        file_info.checks = rules.attributes(f_path)
+                    group.append(links.mark(mark_to_hash(file_info, trusted_digest, stage_metrics)))
+                    if file_info.to_hash:
+                        files.append((f_path, file_info.file_id()))
+                        if len(files) >= batch_size:
+                            await send(group, files)
+                            group, files = [], []
+                if group:
+                    await send(group, files)
+            await order_queue.put(None)
+
+        async def emit():
+            while True:
+                item = await order_queue.get()
+                if item is None:
+                    break
+                group, hashing = item
+                if hashing is not None:
+                    digests, hash_metrics = await hashing
+                    stage_metrics.merge(hash_metrics)
+                    digests = iter(digests)
+                    for file_info in group:
+                        if file_info.to_hash:
+                            file_info.message_digest, file_info.fast_digest, file_info.chunks = next(digests)
+                await loop.run_in_executor(None, hand_over, [links.fill(file_info) for file_info in group])
+
+        try:
+            await asyncio.gather(walk(), collect(), emit())
+        finally:
+            for pool in (walk_pool, stat_pool, hash_pool):
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def main_thread():
+        try:
+            asyncio.run(run())
+            hand_over([end])
+        except BaseException as e:  # raised again in the consumer
+            hand_over([e])
+
+    thread = threading.Thread(target=main_thread, name="siv-pipeline", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = out_queue.get()
+            if item is end:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
+        metrics.merge(walk_metrics)
+        metrics.merge(stage_metrics)
+
+
+def initialization_mode(monitored_dir, verification_file: str, report_file: str, hash_fuc: str,
+                        jobs: int = 1, backend: str = "thread", db_format: str = "csv",
+                        io_mode: str = "readinto", buffer_size: int = DEFAULT_BUFFER_SIZE,
+                        persist_names: bool = False, metrics_format: str = None, rules: Rules = None,
+                        pipeline: str = "pool", fast_fuc: str = None, report_format: str = "text",
+                        checkpoint_interval: float = CHECKPOINT_INTERVAL, resume: bool = False,
+                        chunk_size: int = 0, chunk_threshold: int = CHUNK_THRESHOLD, throttle: Throttle = None,
+                        drop_cache: bool = False, compress: str = None, compress_level: int = None,
+                        overwrite=False):
+    """
+    initialization mode of one or several monitored directories, the "rules", the digests of the
+    directories, the hard link sets and the chunk digests are stored in the verification file.
+    return the "RunResult".
+    """
+    valid_files_dirs(monitored_dir, verification_file, report_file, "init", resume, overwrite)
+    if compress is not None:
+        checkpoint_interval = 0
+
+    start_time = time.perf_counter()
+    metrics = Metrics(timed=metrics_format is not None)  # the phases are only timed for the metrics file
+    clock = metrics.clock
+    checkpoint = Checkpoint(verification_file + ".checkpoint",
+                            {"mode": "init", "monitored_dirs": monitored_dirs(monitored_dir),
+                             "verification_file": os.path.abspath(verification_file), "hash": hash_fuc,
+                             "format": db_format}, checkpoint_interval)
+    state = checkpoint.load() if resume else None
+    traverse_rules = rules
+    if state is not None:
+        metrics.count("dirs", checkpoint.counts["dirs"])
+        metrics.count("files", checkpoint.counts["files"])
+        traverse_rules = (rules or Rules()).shard(resume_range(rules and rules.path_range, state["last_path"]))
+        logger.info(f"Resume after '{state['last_path']}'.")
+
+    # create the verification file using csv file or the binary format
+    with create_baseline(verification_file, hash_fuc, db_format, state and state["baseline"], compress,
+                         compress_level) as baseline:
+        hasher = Hasher(hash_fuc, io_mode, buffer_size, fast_fuc, 1, chunk_size=chunk_size,
+                        chunk_threshold=chunk_threshold, chunk_jobs=jobs, throttle=throttle, drop_cache=drop_cache,
+                        follow_symlinks=rules is not None and rules.follow_symlinks)
+        resolver = NameResolver()
+        merkle_tree = MerkleTree(hash_fuc, monitored_dir)
+        link_sets = LinkSets(state["links"] if state is not None else ())
+        chunk_digests = ChunkDigests(chunk_size, chunk_threshold, state["chunks"] if state is not None else ())
+        if state is not None:  # the digests of the directories also cover the records before the checkpoint
+            for f_info in baseline.written_records():
+                if rules:
+                    f_info.checks = rules.attributes(f_info.f_path)
+                merkle_tree.add(f_info)
+        for f_info in traverse_dir(monitored_dir, hasher, jobs, backend, resolver=resolver, metrics=metrics,
+                                   rules=traverse_rules, pipeline=pipeline):
+            write_start = clock()
+            baseline.write(f_info)
+            metrics.add_time("db_write", clock() - write_start)
+            merkle_tree.add(f_info)
+            link_sets.add(f_info)
+            chunk_digests.add(f_info)
+            checkpoint.add(f_info)
+            if checkpoint.due():
+                checkpoint.save(f_info.f_path, {"baseline": baseline.checkpoint(), "links": link_sets.rows(1),
+                                                "chunks": chunk_digests.rows()})
+        merkle_tree.save(baseline)
+        # the other paths of a set in a shard may be in other shards, see "shard_link_splits()"
+        link_sets.save(baseline, 1 if rules is not None and rules.path_range is not None else 2)
+        chunk_digests.save(baseline)
+        if fast_fuc:
+            baseline.write_section("fast_hash", [[fast_fuc]])
+        if persist_names:
+            resolver.save(baseline)
+        (rules or Rules()).save(baseline)  # at least whether the symbolic links are followed
+    checkpoint.remove()
+
+    end_time = time.perf_counter()
+    total_time = end_time - start_time
+    result = RunResult("init", monitored_dirs(monitored_dir), os.path.abspath(verification_file),
+                       os.path.abspath(report_file), metrics.counters.get("dirs", 0),
+                       metrics.counters.get("files", 0), 0, 0, total_time, metrics)
+
+    # create the report file
+    summary = [
+        ("monitored_dirs", "The monitored directory is", result.monitored_dirs),
+        ("verification_file", "The verification file is", result.verification_file),
+        ("dirs", "The number of directories inside is", result.dirs),
+        ("files", "The number of files is", result.files),
+        ("name_lookups", "The name lookups are", (resolver.misses, resolver.hits)),
+    ]
+    if metrics.counters.get("linked_files"):
+        summary.append(("linked_files", "The number of hard links reused is", metrics.counters["linked_files"]))
+    summary.append(("throughput", "The throughput is", throughput(metrics, total_time)))
+    summary.append(("total_time", "The total time is", total_time))
+    with metrics.timer("report_write"), create_report(report_file, report_format, 37) as report:
+        report.summary(summary)
+
+    if metrics_format:
+        write_metrics(metrics, report_file, metrics_format, resolver, total_time)
+    return result
+
+
+def unchanged_subtrees(monitored_dir, hash_fuc: str, stored_digests: dict, resolver: NameResolver,
+                       trusted_digest, metrics: Metrics, rules: Rules) -> set:
+    """
+    the stat pass of the fast verification, the largest directories whose digest is the one in
+    "stored_digests". it stats every entry and reads the verification file, the pruned sub trees only save
+    their comparison, not a stat or a hash.
+    """
+    merkle_tree = MerkleTree(hash_fuc, monitored_dir)
+    for f_info in collect_dir_trusted(monitored_dir, resolver, trusted_digest, metrics, rules):
+        merkle_tree.add(f_info)
+    unchanged = {directory for directory, digest in merkle_tree.digests().items()
+                 if stored_digests.get(directory) == digest}
+    return {directory for directory in unchanged if os.path.dirname(directory) not in unchanged}
+
+
+def verification_mode(monitored_dir, verification_file: str, report_file: str,
+                      jobs: int = 1, backend: str = "thread", fast: bool = False,
+                      io_mode: str = "readinto", buffer_size: int = DEFAULT_BUFFER_SIZE,
+                      persist_names: bool = False, metrics_format: str = None, rules: Rules = None,
+                      pipeline: str = "pool", deep_period: int = DEEP_PERIOD, report_format: str = "text",
+                      checkpoint_interval: float = CHECKPOINT_INTERVAL, resume: bool = False,
+                      sample_chunks: int = 0, throttle: Throttle = None, drop_cache: bool = False,
+                      overwrite=False):
+    """
+    verification mode of one or several monitored directories, by the rules stored in the verification
+    file together with "rules"; with "fast", the files with an unchanged stat fingerprint are not hashed
+    again, see "unchanged_subtrees()". return the "RunResult".
+    """
+    valid_files_dirs(monitored_dir, verification_file, report_file, "verif", resume, overwrite)
+
+    checkpoint = Checkpoint(report_file + ".checkpoint",
+                            {"mode": "verif", "monitored_dirs": monitored_dirs(monitored_dir),
+                             "verification_file": os.path.abspath(verification_file),
+                             "report_file": os.path.abspath(report_file), "format": report_format},
+                            checkpoint_interval)
+    state = checkpoint.load() if resume else None
+    if state is not None:
+        logger.info(f"Resume after '{state['last_path']}'.")
+
+    # compare files
+    with open_baseline(verification_file) as baseline, \
+            create_report(report_file, report_format, offset=state and state["report_offset"]) as report:
+        start_time = time.perf_counter()
+        fast_fuc = (baseline.read_section("fast_hash") or [[None]])[0][0]
+        if fast_fuc is not None and fast_fuc not in FAST_HASH_LISTS:
+            raise SivError(f"The fast digest '{fast_fuc}' of the verification file is not available, install xxhash.")
+        if fast_fuc is not None and not deep_period:
+            logger.warning(f"The deep period is 0, no file is hashed with '{baseline.hash_fuc}' again, "
+                           f"only the '{fast_fuc}' digests are verified.")
+        rules = Rules.load(baseline).merge(rules)
+        chunk_digests = ChunkDigests.load(baseline)
+        hasher = Hasher(baseline.hash_fuc, io_mode, buffer_size, fast_fuc, deep_period, chunk_digests.chunk_size,
+                        chunk_digests.chunk_threshold, jobs, throttle, drop_cache, rules.follow_symlinks)
+        resolver = NameResolver()
+        if persist_names and not resolver.load(baseline):
+            logger.warning("The verification file has no stored names, look them up.")
+
+        metrics = Metrics(timed=metrics_format is not None)
+        clock = metrics.clock
+        warnings_num = 0
+        cursor = BaselineCursor(baseline) if fast else None
+        stored_digests = MerkleTree.load(baseline) if fast else None
+        if stored_digests:
+            rules = rules or Rules()
+            stat_cursor = BaselineCursor(baseline)  # the cursors only move forward
+            rules.pruned = unchanged_subtrees(monitored_dir, baseline.hash_fuc, stored_digests, resolver,
+                                              stat_cursor.trusted_digest, metrics, rules)
+            stat_cursor.close()
+            # the first pass counted the whole tree, the comparison only counts the changed sub trees again
+            counts = {name: metrics.counters.get(name, 0) for name in ("dirs", "files", "trusted_files")}
+        link_sets = LinkSets.load(baseline)
+        link_paths = {path for paths in link_sets.paths.values() for path in paths}
+        new_keys = {}  # path of a hard link set -> its (device, inode) now
+        if state is not None:
+            warnings_num = state["warnings"]
+            new_keys = state["link_keys"]
+            for name, value in checkpoint.counts.items():
+                metrics.count(name, value)
+            rules = rules or Rules()
+            rules.path_range = resume_range(rules.path_range, state["last_path"])
+        trusted_digest = cursor.trusted_digest if fast else None
+        sampler = None
+        if sample_chunks and chunk_digests.digests:
+            # its counters are merged after the traversal, the async pipeline calls it from another thread
+            sampler = ChunkSampler(chunk_digests, hasher, sample_chunks, trusted_digest)
+            trusted_digest = sampler.trusted_digest
+        f_info = traverse_dir(monitored_dir, hasher, jobs, backend, trusted_digest, resolver, metrics, rules, pipeline)
+        # the records which the rules of this verification leave out of the traversal are left out here too
+        old_records = kept_records(baseline, rules, monitored_dirs(monitored_dir))
+        traverse_time = 0.0
+
+        def next_old():
+            read_start = clock()
+            record = next(old_records, FileInfo())
+            while rules and record and rules.is_pruned(record.f_path):
+                record = next(old_records, FileInfo())
+            metrics.add_time("db_read", clock() - read_start)
+            return record
+
+        def next_new():
+            nonlocal traverse_time
+            traverse_start = clock()
+            record = next(f_info, None)
+            traverse_time += clock() - traverse_start
+            if link_paths and record is not None and record.f_path in link_paths:
+                new_keys[record.f_path] = (record.device, record.inode)
+            return record
+
+        def write(finding):
+            write_start = clock()
+            report.finding(finding)
+            metrics.add_time("report_write", clock() - write_start)
+
+        loop_start = clock()
+        old_f_info = next_old()
+        new_f_info = next_new()
+
+        while old_f_info or new_f_info:
+            # File is deleted
+            if (old_f_info and not new_f_info) or (old_f_info and new_f_info
+                                                   and old_f_info.f_path < new_f_info.f_path):
+                warnings = compare_changes(old_f_info, None)
+                last_path = old_f_info.f_path
+                old_f_info = next_old()
+            # File is created
+            elif (not old_f_info and new_f_info) or \
+                    (old_f_info and new_f_info and old_f_info.f_path > new_f_info.f_path):
+                warnings = compare_changes(None, new_f_info)
+                last_path = new_f_info.f_path
+                checkpoint.add(new_f_info)
+                new_f_info = next_new()
+            # file remains
+            elif old_f_info and new_f_info and old_f_info.f_path == new_f_info.f_path:
+                warnings = compare_changes(old_f_info, new_f_info, new_f_info.checks)
+                if new_f_info.chunks and warnings and warnings[-1].attribute == "digest":
+                    ranges = chunk_digests.ranges(new_f_info)
+                    if ranges is not None:
+                        warnings.append(ranges)
+                last_path = new_f_info.f_path
+                checkpoint.add(new_f_info)
+                old_f_info = next_old()
+                new_f_info = next_new()
+            else:
+                raise SivError("Error during file comparison.")
+
+            for warning in warnings:
+                write(warning)
+            warnings_num += len(warnings)
+            # every path up to "last_path" is compared on both sides
+            if checkpoint.due():
+                checkpoint.save(last_path, {"warnings": warnings_num, "link_keys": new_keys,
+                                            "report_offset": report.checkpoint()})
+
+        for finding in link_sets.splits(new_keys, rules):
+            write(finding)
+            warnings_num += 1
+
+        # the time of the loop which is not spent reading both sides and writing the report
+        metrics.add_time("compare", clock() - loop_start - traverse_time
+                         - metrics.seconds["db_read"] - metrics.seconds["report_write"])
+
+        if cursor is not None:
+            cursor.close()
+        if sampler is not None:
+            metrics.merge(sampler.metrics)
+        if stored_digests:
+            metrics.counters.update(counts)
+
+        end_time = time.perf_counter()
+        total_time = end_time - start_time
+        result = RunResult("verif", monitored_dirs(monitored_dir), os.path.abspath(verification_file),
+                           os.path.abspath(report_file), metrics.counters.get("dirs", 0),
+                           metrics.counters.get("files", 0), warnings_num, metrics.counters.get("trusted_files", 0),
+                           total_time, metrics)
+
+        # report summary
+        summary = [
+            ("monitored_dirs", "The monitored directory is", result.monitored_dirs),
+            ("verification_file", "The verification file is", result.verification_file),
+            ("report_file", "The report file is", result.report_file),
+            ("dirs", "The number of directories inside is", result.dirs),
+            ("files", "The number of files is", result.files),
+            ("warnings", "The number of warnings is", warnings_num),
+            ("name_lookups", "The name lookups are", (resolver.misses, resolver.hits)),
+        ]
+        if fast:
+            summary.append(("trusted_files", "The number of files not hashed again is", result.trusted_files))
+        if stored_digests:
+            summary.append(("unchanged_subtrees", "The number of unchanged sub trees is", len(rules.pruned)))
+        if fast_fuc is not None:
+            summary.append(("fast_only_files", "The number of fast digest only files is",
+                            metrics.counters.get("fast_only_files", 0)))
+        if metrics.counters.get("linked_files"):
+            summary.append(("linked_files", "The number of hard links reused is", metrics.counters["linked_files"]))
+        if sample_chunks and chunk_digests.digests:
+            summary.append(("sampled_files", "The number of sampled files is",
+                            metrics.counters.get("sampled_files", 0)))
+        summary.append(("throughput", "The throughput is", throughput(metrics, total_time)))
+        summary.append(("total_time", "The total time is", total_time))
+        report.summary(summary)
+    checkpoint.remove()
+
+    if metrics_format:
+        write_metrics(metrics, report_file, metrics_format, resolver, total_time, warnings_num)
+    return result
+
+
+def run_shards(mode_function, monitored_dir, verification_file: str, report_file: str, shards_num: int,
+               *args, rules: Rules = None, **kwargs):
+    """
+    run the initialization or verification mode of every shard in its own process, with its own
+    verification file and report file, then merge the shard reports into "report_file".
+    """
+    import multiprocessing
+    mode = "init" if mode_function is initialization_mode else "verif"
+    resume = kwargs.pop("resume", False)
+    overwrite = kwargs.pop("overwrite", False)
+    files = [(shard_file(verification_file, k, shards_num), shard_file(report_file, k, shards_num))
+             for k in range(1, shards_num + 1)]
+    resumes = [resume and os.path.isfile((shard_verification_file if mode == "init" else shard_report_file)
+                                         + ".checkpoint")
+               for shard_verification_file, shard_report_file in files]
+    # check all existing files before any of them is removed, the shard processes start without them
+    for (shard_verification_file, shard_report_file), shard_resume in zip(files, resumes):
+        if not shard_resume:
+            valid_files_dirs(monitored_dir, shard_verification_file, shard_report_file, mode, overwrite=overwrite)
+    valid_report_file(report_file, overwrite=overwrite)
+    for (shard_verification_file, shard_report_file), shard_resume in zip(files, resumes):
+        if shard_resume:
+            continue
+        for file in (shard_verification_file, shard_report_file) if mode == "init" else (shard_report_file,):
+            if os.path.isfile(file):
+                os.remove(file)
+
+    if mode == "init":
+        bounds = shard_bounds(monitored_dir, shards_num, rules)
+        shard_rules = [(rules or Rules()).shard(path_range) for path_range in bounds]
+    else:
+        shard_rules = [rules] * shards_num
+    processes = [multiprocessing.Process(target=run_shard,
+                                         args=(mode_function, monitored_dir, shard_verification_file,
+                                               shard_report_file) + args,
+                                         kwargs=dict(kwargs, rules=shard_rule, resume=shard_resume))
+                 for (shard_verification_file, shard_report_file), shard_rule, shard_resume
+                 in zip(files, shard_rules, resumes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = [str(k) for k, process in enumerate(processes, 1) if process.exitcode != 0]
+    if failed:
+        raise SivError(f"The shards '{', '.join(failed)}' of {shards_num} failed.")
+
+    findings = shard_link_splits([shard_verification_file for shard_verification_file, _ in files], rules) \
+        if mode == "verif" else []
+    merge_reports([shard_report_file for _, shard_report_file in files], report_file, findings)
+
+
+def shard_link_splits(shard_verification_files: list, rules: Rules = None) -> list:
+    """
+    the findings about the hard link sets across the shards whose parts in the shards, which the verification
+    of each shard checks, no longer share one inode with each other. their paths are checked by their stat now.
+    """
+    parts = {}  # (device, inode) -> the paths of the set in every shard
+    for shard_verification_file in shard_verification_files:
+        with open_baseline(shard_verification_file) as baseline:
+            for key, paths in LinkSets.load(baseline).paths.items():
+                parts.setdefault(key, []).append([path for path in paths
+                                                  if not rules or rules.keep(path, os.path.basename(path), False)])
+    findings = []
+    for (device, inode), shard_paths in parts.items():
+        if len(shard_paths) < 2:
+            continue
+        new_keys = {}
+        for path in (path for paths in shard_paths for path in paths):
+            file_stat = stat_path(path)
+            if file_stat is not None:
+                new_keys[path] = (file_stat.st_dev, file_stat.st_ino)
+        # a part which split on its own is reported by the verification of its shard
+        if any(LinkSets([[device, inode, *paths]]).splits(new_keys) for paths in shard_paths):
+            continue
+        findings += LinkSets([[device, inode, *(path for paths in shard_paths for path in paths)]]).splits(new_keys)
+    return findings
+
+
+def run_shard(mode_function, *args, **kwargs):
+    """
+    the process of one shard, which ends with the message of an error and a non-zero exit status.
+    """
+    try:
+        mode_function(*args, **kwargs)
+    except SivError as e:
+        sys.exit(str(e))
+
+
+def merge_reports(shard_reports: list, report_file: str, findings: list = ()):
+    """
+    merge the reports of the shards of one run: the warnings in the order of the shards, then "findings"
+    about all of them, then one summary, which adds up the numbers, keeps the longest time and lists
+    the different paths. the text reports and the JSON Lines reports are told apart by their first character.
+    """
+    shard_lines = []
+    for shard_report in shard_reports:
+        try:
+            with open(shard_report) as rd_file:
+                shard_lines.append(rd_file.readlines())
+        except OSError as e:
+            raise SivError(f"The shard report '{shard_report}' can not be read: {e.strerror}.")
+    if shard_lines[0][:1] and shard_lines[0][0].startswith("{"):
+        merge_json_reports(shard_reports, shard_lines, report_file, findings)
+    else:
+        merge_text_reports(shard_reports, shard_lines, report_file, findings)
+    logger.info(f"The shard reports are merged into the '{os.path.abspath(report_file)}'.")
+
+
+def merge_text_reports(shard_reports: list, shard_lines: list, report_file: str, findings: list = ()):
+    warnings = []
+    summaries = {}
+    for shard_report, lines in zip(shard_reports, shard_lines):
+        summary_start = next((i for i, line in enumerate(lines) if line.startswith("The monitored directory is:")),
+                             None)
+        if summary_start is None:
+            raise SivError(f"The shard report '{shard_report}' has no summary.")
+        warnings += lines[:summary_start]
+        for line in lines[summary_start:]:
+            summaries.setdefault(line.partition(":")[0], []).append(line)
+    warnings += [format_finding(finding) for finding in findings]
+    if findings and "The number of warnings is" in summaries:  # added up with the numbers of the shards
+        summaries["The number of warnings is"].append(f"'{len(findings)}'")
+
+    with open(report_file, 'w') as wr_file:
+        wr_file.writelines(warnings)
+        for label, lines in summaries.items():
+            numbers = [[float(n) for n in re.findall(r"'(-?\d+(?:\.\d+)?)'", line)] for line in lines]
+            if numbers[0] and all(len(n) == len(numbers[0]) for n in numbers):
+                if "time" in label:
+                    merged = [round(max(column), 6) for column in zip(*numbers)]
+                else:
+                    merged = [round(sum(column), 6) if any(n % 1 for n in column) else int(sum(column))
+                              for column in zip(*numbers)]
+                values = iter(merged)
+                wr_file.write(re.sub(r"'(-?\d+(?:\.\d+)?)'", lambda _: f"'{next(values)}'", lines[0]))
+            else:
+                prefix, _, rest = lines[0].partition("'")
+                suffix = rest.rpartition("'")[2]
+                paths = list(dict.fromkeys(line.partition("'")[2].rpartition("'")[0] for line in lines))
+                wr_file.write(f"{prefix}'{joined_dirs(paths)}'{suffix}")
+
+
+def merge_json_reports(shard_reports: list, shard_lines: list, report_file: str, findings: list = ()):
+    import json
+    summary = {}
+    with open(report_file, 'w') as wr_file:
+        for shard_report, lines in zip(shard_reports, shard_lines):
+            records = [json.loads(line) for line in lines]
+            if not records or records[-1].get("type") != "summary":
+                raise SivError(f"The shard report '{shard_report}' has no summary.")
+            wr_file.writelines(lines[:-1])
+            for key, value in records[-1].items():
+                if key not in summary:
+                    summary[key] = value
+                elif key == "total_time":
+                    summary[key] = max(summary[key], value)
+                elif isinstance(value, (int, float)):
+                    summary[key] += value
+                elif isinstance(value, dict):
+                    summary[key] = {name: summary[key].get(name, 0) + number for name, number in value.items()}
+                elif value != summary[key]:
+                    values = summary[key] if isinstance(summary[key], list) else [summary[key]]
+                    summary[key] = values + [v for v in (value if isinstance(value, list) else [value])
+                                             if v not in values]
+        wr_file.writelines(json.dumps(finding_record(finding)) + "\n" for finding in findings)
+        if "warnings" in summary:
+            summary["warnings"] += len(findings)
+        wr_file.write(json.dumps(summary) + "\n")
+
+
+def merge_records(old_records, new_records) -> Generator[tuple, any, None]:
+    """
+    the pairs (old, new) of the records of the same path of two streams of records in sorted path order,
+    with None on the side which has no record of the path.
+    """
+    old_f_info = next(old_records, None)
+    new_f_info = next(new_records, None)
+    while old_f_info is not None or new_f_info is not None:
+        if new_f_info is None or (old_f_info is not None and old_f_info.f_path < new_f_info.f_path):
+            yield old_f_info, None
+            old_f_info = next(old_records, None)
+        elif old_f_info is None or old_f_info.f_path > new_f_info.f_path:
+            yield None, new_f_info
+            new_f_info = next(new_records, None)
+        else:
+            yield old_f_info, new_f_info
+            old_f_info = next(old_records, None)
+            new_f_info = next(new_records, None)
+
+
+def kept_records(records, rules: Rules = None, roots: list = None):
+    """
+    the records of a verification file which "rules" keep, as the traversal would, with the attributes
+    to compare; the directories above a record are checked by their paths under the monitored "roots".
+    """
+    if not rules:
+        return iter(records)
+    return filter_records(records, rules, roots)
+
+
+def filter_records(records, rules: Rules, roots: list = None) -> Generator[FileInfo, any, None]:
+    excluded = set()
+    entered = dict.fromkeys(roots or (), True)  # directory -> whether the traversal descends into it
+
+    def is_entered(directory):
+        if directory not in entered:
+            parent = os.path.dirname(directory)
+            entered[directory] = parent != directory and is_entered(parent) \
+                and rules.keep(directory, os.path.basename(directory), True)
+        return entered[directory]
+
+    for f_info in records:
+        path = f_info.f_path
+        if not rules.in_range(path):
+            continue
+        if roots and not is_entered(os.path.dirname(path)):
+            continue
+        if excluded:
+            parent = os.path.dirname(path)
+            while parent not in excluded and parent != os.path.dirname(parent):
+                parent = os.path.dirname(parent)
+            if parent in excluded:
+                continue
+        if not rules.keep(path, os.path.basename(path), f_info.is_directory()):
+            if f_info.is_directory():
+                excluded.add(path)
+            continue
+        f_info.checks = rules.attributes(path)
+        yield f_info
+
+
+def compare_report_file(report_file: str, verification_file: str) -> str:
+    """
+    the report file of the comparison with one of several verification files, 'name.<its name>.ext'.
+    """
+    root, ext = os.path.splitext(report_file)
+    return f"{root}.{os.path.splitext(os.path.basename(verification_file))[0]}{ext}"
+
+
+def compare_mode(verification_files: list, report_file: str, rules: Rules = None, report_format: str = "text",
+                 overwrite=False):
+    """
+    comparison mode of verification files, without the file system: the first one is compared with each
+    of the others as in the verification mode, each comparison with its own report, see "compare_report_file()".
+    return the "RunResult" of every comparison.
+    """
+    old_file, new_files = verification_files[0], verification_files[1:]
+    for verification_file in verification_files:
+        if not os.path.isfile(verification_file):
+            raise SivError(f"The verification file '{verification_file}' does not exist.")
+    report_files = [report_file] if len(new_files) == 1 else [compare_report_file(report_file, new_file)
+                                                              for new_file in new_files]
+    if len(set(report_files)) != len(report_files):
+        raise SivError("The verification files to compare need different names, the names of their reports.")
+    for new_report_file in report_files:
+        valid_report_file(new_report_file, overwrite=overwrite)
+
+    results = []
+    with open_baseline(old_file) as old_baseline:
+        rules = Rules.load(old_baseline).merge(rules)
+        link_sets = LinkSets.load(old_baseline)
+        link_paths = {path for paths in link_sets.paths.values() for path in paths}
+        chunk_digests = ChunkDigests.load(old_baseline)
+        # the golden verification file of several comparisons is parsed only once
+        old_records = list(kept_records(old_baseline, rules)) if len(new_files) > 1 else None
+
+        for new_file, new_report_file in zip(new_files, report_files):
+            start_time = time.perf_counter()
+            metrics = Metrics(timed=False)
+            warnings_num = 0
+            new_keys = {}  # path of a hard link set -> its (device, inode) in the new verification file
+            with open_baseline(new_file) as new_baseline:
+                if new_baseline.hash_fuc != old_baseline.hash_fuc:
+                    raise SivError(f"The verification file '{new_file}' has the hash function "
+                                   f"'{new_baseline.hash_fuc}', not '{old_baseline.hash_fuc}'.")
+                new_chunks = ChunkDigests.load(new_baseline)
+                if new_chunks.settings() != chunk_digests.settings():
+                    raise SivError(f"The chunks of the verification file '{new_file}' are '{new_chunks}', "
+                                   f"not '{chunk_digests}'.")
+                with create_report(new_report_file, report_format) as report:
+                    records = iter(old_records) if old_records is not None else kept_records(old_baseline, rules)
+                    for old_f_info, new_f_info in merge_records(records, kept_records(new_baseline, rules)):
+                        if new_f_info is not None:
+                            metrics.count("dirs" if new_f_info.is_directory() else "files")
+                            if new_f_info.f_path in link_paths:
+                                new_keys[new_f_info.f_path] = (new_f_info.device, new_f_info.inode)
+                        warnings = compare_changes(old_f_info, new_f_info,
+                                                   new_f_info.checks if new_f_info else ALL_ATTRIBUTES)
+                        if warnings and warnings[-1].attribute == "digest":
+                            new_f_info.chunks = new_chunks.digests.get(new_f_info.f_path)
+                            ranges = chunk_digests.ranges(new_f_info)
+                            if ranges is not None:
+                                warnings.append(ranges)
+                        for warning in warnings:
+                            report.finding(warning)
+                        warnings_num += len(warnings)
+                    for finding in link_sets.splits(new_keys):
+                        report.finding(finding)
+                        warnings_num += 1
+
+                    total_time = time.perf_counter() - start_time
+                    result = RunResult("compare", None, os.path.abspath(new_file), os.path.abspath(new_report_file),
+                                       metrics.counters.get("dirs", 0), metrics.counters.get("files", 0),
+                                       warnings_num, 0, total_time, metrics)
+                    report.summary([
+                        ("old_verification_file", "The old verification file is", os.path.abspath(old_file)),
+                        ("verification_file", "The new verification file is", result.verification_file),
+                        ("report_file", "The report file is", result.report_file),
+                        ("dirs", "The number of directories inside is", result.dirs),
+                        ("files", "The number of files is", result.files),
+                        ("warnings", "The number of warnings is", warnings_num),
+                        ("total_time", "The total time is", total_time),
+                    ])
+            results.append(result)
+    return results
+
+
+class Inotify:
+    """
+    a minimal binding of the Linux inotify API with ctypes.
+    raise OSError if inotify is not available.
+    """
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+                  | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+    EVENT_STRUCT = struct.Struct("iIII")
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            raise OSError("inotify is not available") from e
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.get_errno = ctypes.get_errno
+        self.dirs = {}  # watch descriptor -> directory
+
+    def add_watch(self, path: str) -> bool:
+        """
+        watch the directory "path", False if it can not be watched (e.g. the limit of watches is reached).
+        """
+        wd = self._add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            return False
+        self.dirs[wd] = path
+        return True
+
+    def read_events(self, timeout: float) -> list:
+        """
+        wait at most "timeout" seconds for events, return them as (path, mask),
+        the path of an overflow of the event queue is None.
+        """
+        import select
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        position = 0
+        while position < len(data):
+            wd, mask, _, name_len = self.EVENT_STRUCT.unpack_from(data, position)
+            position += self.EVENT_STRUCT.size
+            name = data[position:position + name_len].rstrip(b"\0")
+            position += name_len
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((None, mask))
+                continue
+            directory = self.dirs.get(wd)
+            if mask & self.IN_IGNORED:
+                self.dirs.pop(wd, None)
+            if directory is None:
+                continue
+            events.append((os.path.join(directory, os.fsdecode(name)) if name else directory, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_mode(monitored_dir, verification_file: str, report_file: str,
+               jobs: int = 1, backend: str = "thread", fast: bool = False,
+               io_mode: str = "readinto", buffer_size: int = DEFAULT_BUFFER_SIZE,
+               persist_names: bool = False, sweep_interval: float = 3600, settle_time: float = 1,
+               rules: Rules = None, pipeline: str = "pool", report_format: str = "text",
+               throttle: Throttle = None, drop_cache: bool = False, overwrite=False):
+    """
+    watch mode, a long-running verification mode which checks the paths inotify reports as changed, with
+    a full sweep every "sweep_interval" seconds and after an overflow of the events; a path is only reported
+    again when its warnings change.
+    """
+    import signal
+    valid_files_dirs(monitored_dir, verification_file, report_file, "verif", overwrite=overwrite)
+    dirs = monitored_dirs(monitored_dir)
+
+    with open_baseline(verification_file) as baseline_file:
+        rules = Rules.load(baseline_file).merge(rules)
+        chunk_digests = ChunkDigests.load(baseline_file)
+        hasher = Hasher(baseline_file.hash_fuc, io_mode, buffer_size, chunk_size=chunk_digests.chunk_size,
+                        chunk_threshold=chunk_digests.chunk_threshold, chunk_jobs=jobs, throttle=throttle,
+                        drop_cache=drop_cache, follow_symlinks=rules.follow_symlinks)
+        resolver = NameResolver()
+        if persist_names and not resolver.load(baseline_file):
+            logger.warning("The verification file has no stored names, look them up.")
+        baseline = {f_info.f_path: f_info for f_info in baseline_file}
+    baseline_paths = list(baseline)  # sorted like the verification file
+    observed = dict(baseline)  # the last seen state of every path, for "fast"
+    reported = {}  # path -> the last warnings written for it
+
+    try:
+        inotify = Inotify()
+    except OSError as e:
+        logger.warning(f"{e}, fall back to a full sweep every '{sweep_interval}' seconds.")
+        inotify = None
+
+    report_writer = create_report(report_file, report_format, line_buffered=True)  # the findings show up at once
+    start_time = time.perf_counter()
+    sweeps_num = 0
+    events_num = 0
+    warnings_num = 0
+
+    def report(path, old_f_info, new_f_info):
+        nonlocal warnings_num
+        if new_f_info:
+            observed[path] = new_f_info
+        else:
+            observed.pop(path, None)
+        warnings = compare_changes(old_f_info, new_f_info, new_f_info.checks if new_f_info else ALL_ATTRIBUTES)
+        if warnings == reported.get(path, []):
+            return
+        time_ns = time.time_ns()
+        if warnings:
+            reported[path] = warnings
+        else:
+            reported.pop(path, None)
+            report_writer.finding(Finding("restored", path), time_ns)
+        for warning in warnings:
+            report_writer.finding(warning, time_ns)
+        warnings_num += len(warnings)
+
+    def check(path):
+        try:
+            file_stat = stat_path(path, rules.follow_symlinks)
+        except OSError:  # moved away with a directory above it
+            file_stat = None
+        new_f_info = stat_info(path, file_stat, resolver) if file_stat is not None else None
+        if new_f_info and new_f_info.is_file and "digest" in rules.attributes(path):
+            digest = unchanged_digest(observed.get(path), new_f_info) if fast else None
+            try:
+                new_f_info.message_digest = digest or hasher.hash_file(path, file_id=new_f_info.file_id())
+            except OSError:
+                new_f_info.message_digest = None
+            if new_f_info.message_digest is None:  # removed or replaced in the meantime, its next event checks it
+                new_f_info = None
+        if new_f_info:
+            new_f_info.checks = rules.attributes(path)
+        report(path, baseline.get(path), new_f_info)
+
+    def watch_tree(path):
+        if inotify is not None and not inotify.add_watch(path):
+            logger.warning(f"Unable to watch '{path}', it is only checked by the full sweeps.")
+        if inotify is None:
+            return
+        watched = {path}
+        for entry in scan_dir(path, rules=rules):
+            # a directory outside the path range of a shard is not listed, but its content inside the range is
+            directories = [os.path.dirname(entry.path)]
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            for directory in directories:
+                if directory not in watched:
+                    watched.add(directory)
+                    inotify.add_watch(directory)
+
+    def sweep():
+        nonlocal sweeps_num
+        sweeps_num += 1
+        for monitored_dir in dirs:
+            watch_tree(monitored_dir)
+        trusted_digest = (lambda f_info: unchanged_digest(observed.get(f_info.f_path), f_info)) if fast else None
+        seen = set()
+        for new_f_info in traverse_dir(dirs, hasher, jobs, backend, trusted_digest, resolver,
+                                       rules=rules, pipeline=pipeline):
+            seen.add(new_f_info.f_path)
+            report(new_f_info.f_path, baseline.get(new_f_info.f_path), new_f_info)
+        for path in baseline_paths + list(reported):
+            if path not in seen:
+                report(path, baseline.get(path), None)
+
+    def subtree(path):
+        """
+        the paths of the verification file below "path".
+        """
+        prefix = path + os.sep
+        i = bisect_left(baseline_paths, prefix)
+        while i < len(baseline_paths) and baseline_paths[i].startswith(prefix):
+            yield baseline_paths[i]
+            i += 1
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # only the main thread may handle a signal, the watch mode may run in another one, e.g. of the GUI
+    main_thread = threading.current_thread() is threading.main_thread()
+    if main_thread:
+        previous_handler = signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Watch the directory '{joined_dirs(dirs)}', stop with Ctrl-C.")
+    try:
+        sweep()
+        next_sweep = time.monotonic() + sweep_interval
+        dirty = set()
+        while True:
+            timeout = max(0.0, next_sweep - time.monotonic())
+            if inotify is None:
+                time.sleep(timeout)
+                events = []
+            else:
+                # wait for the events to settle before the changed paths are checked
+                events = inotify.read_events(min(timeout, settle_time) if dirty else timeout)
+            events_num += len(events)
+            for path, mask in events:
+                if path is None:  # the queue overflowed, events are lost
+                    next_sweep = 0
+                    continue
+                if path in dirs or not rules.keep(path, os.path.basename(path), os.path.isdir(path)):
+                    continue
+                # a directory outside the path range of a shard may have content inside it
+                if rules.in_range(path):
+                    dirty.add(path)
+                # adding or removing an entry changes the modification date of its directory
+                if mask & (Inotify.IN_CREATE | Inotify.IN_DELETE | Inotify.IN_MOVED_FROM | Inotify.IN_MOVED_TO):
+                    parent = os.path.dirname(path)
+                    if parent not in dirs and rules.in_range(parent):
+                        dirty.add(parent)
+                if mask & Inotify.IN_ISDIR and mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO) \
+                        and rules.subtree_in_range(path):
+                    watch_tree(path)
+                    dirty.update(entry.path for entry in scan_dir(path, rules=rules))
+                if mask & Inotify.IN_ISDIR and mask & (Inotify.IN_MOVED_FROM | Inotify.IN_DELETE):
+                    dirty.update(p for p in subtree(path) if rules.in_range(p))
+                    dirty.update(p for p in list(reported) if p.startswith(path + os.sep) and rules.in_range(p))
+
+            if time.monotonic() >= next_sweep:
+                dirty.clear()
+                sweep()
+                next_sweep = time.monotonic() + sweep_interval
+            elif dirty and not events:
+                for path in sorted(dirty):
+                    check(path)
+                dirty.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if main_thread and previous_handler is not None:  # None if it was not set from Python
+            signal.signal(signal.SIGTERM, previous_handler)
+        if inotify is not None:
+            inotify.close()
+        total_time = time.perf_counter() - start_time
+        report_writer.summary([
+            ("monitored_dirs", "The monitored directory is", dirs),
+            ("verification_file", "The verification file is", os.path.abspath(verification_file)),
+            ("report_file", "The report file is", os.path.abspath(report_file)),
+            ("sweeps", "The number of full sweeps is", sweeps_num),
+            ("events", "The number of file system events is", events_num),
+            ("warnings", "The number of warnings is", warnings_num),
+            ("total_time", "The total time is", total_time),
+        ])
+        report_writer.close()
+    return RunResult("watch", dirs, os.path.abspath(verification_file), os.path.abspath(report_file), None, None,
+                     warnings_num, None, total_time, None)
+
@@ -0,0 +1,209 @@
+# System Integrity Verifier(SIV), the tests of the verification files
+
+import csv
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from siv import core
+from siv.core import (FileInfo, CsvBaselineWriter, CsvBaselineReader, BinaryBaselineWriter, BinaryBaselineReader,
+                      open_baseline, initialization_mode, SivError, CSV_TRAILER, DB_MAGIC, DB_VERSION, HEADER_STRUCT)
+
+SECTIONS = {"rules": [["exclude", "*.tmp"], ["symlinks", "record"]], "merkle": [["/srv", "ab" * 32]]}
+
+
+def make_records() -> list:
+    """
+    records of a regular file with a fast digest, a directory, a symbolic link and a file without a digest,
+    in sorted path order.
+    """
+    records = []
+    for f_path, f_mode, digest, fast_digest, link_target in [
+            ("/srv/a", stat.S_IFREG | 0o644, "0f" * 32, "1e" * 8, None),
+            ("/srv/b", stat.S_IFDIR | 0o755, None, None, None),
+            ("/srv/b/c", stat.S_IFLNK | 0o777, None, None, "../a"),
+            ("/srv/d e", stat.S_IFREG | 0o600, None, None, None)]:
+        f_info = FileInfo(f_path, len(f_path), "root", "wheel", None, None, digest,
+                          len(records) + 100, 2049, 1600000000123456789, 1600000000987654321, fast_digest,
+                          link_target)
+        f_info.f_mode = f_mode
+        records.append(f_info)
+    return records
+
+
+def fields(f_info: FileInfo) -> tuple:
+    return (f_info.f_path, f_info.f_size, f_info.user_name, f_info.group_name, f_info.access_right,
+            f_info.message_digest, f_info.inode, f_info.device, f_info.ctime_ns, f_info.mtime_ns,
+            f_info.fast_digest, f_info.link_target)
+
+
+class BinaryBaselineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.verification_file = os.path.join(self.tmp_dir.name, "verificationDB.sivdb")
+        self.records = make_records()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, compress: str = None):
+        with BinaryBaselineWriter(self.verification_file, "sha256", compress=compress) as writer:
+            for f_info in self.records:
+                writer.write(f_info)
+            for name, rows in SECTIONS.items():
+                writer.write_section(name, rows)
+
+    def test_round_trip(self):
+        self.write()
+        with BinaryBaselineReader(self.verification_file) as reader:
+            self.assertEqual(reader.hash_fuc, "sha256")
+            self.assertEqual([fields(f_info) for f_info in reader], [fields(f_info) for f_info in self.records])
+            for name, rows in SECTIONS.items():
+                self.assertEqual(reader.read_section(name), rows)
+            self.assertIsNone(reader.read_section("links"))
+
+    def test_lookup(self):
+        self.write()
+        with BinaryBaselineReader(self.verification_file) as reader:
+            for f_info in self.records:
+                self.assertEqual(fields(reader.lookup(f_info.f_path)), fields(f_info))
+            for f_path in ("/", "/srv/a0", "/srv/b/", "/srv/z"):
+                self.assertIsNone(reader.lookup(f_path))
+
+    def test_compressed(self):
+        self.write("gzip")
+        with open_baseline(self.verification_file) as reader:
+            self.assertEqual([fields(f_info) for f_info in reader], [fields(f_info) for f_info in self.records])
+            self.assertEqual(reader.read_section("rules"), SECTIONS["rules"])
+            with reader.reopen() as other:
+                self.assertEqual(fields(other.lookup("/srv/b/c")), fields(self.records[2]))
+
+    def test_other_version(self):
+        self.write()
+        with open(self.verification_file, 'r+b') as f:
+            f.write(HEADER_STRUCT.pack(DB_MAGIC, DB_VERSION + 1, len(b"sha256")))
+        with self.assertRaises(SivError):
+            BinaryBaselineReader(self.verification_file)
+
+
+class CsvBaselineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.verification_file = os.path.join(self.tmp_dir.name, "verificationDB.csv")
+        self.records = make_records()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, compress: str = None, sections: dict = SECTIONS):
+        with CsvBaselineWriter(self.verification_file, "sha256", compress=compress) as writer:
+            for f_info in self.records:
+                writer.write(f_info)
+            for name, rows in sections.items():
+                writer.write_section(name, rows)
+
+    def test_round_trip(self):
+        self.write()
+        with open_baseline(self.verification_file) as reader:
+            self.assertIsInstance(reader, CsvBaselineReader)
+            self.assertEqual(reader.hash_fuc, "sha256")
+            self.assertEqual([fields(f_info) + (f_info.f_mode,) for f_info in reader],
+                             [fields(f_info) + (f_info.f_mode,) for f_info in self.records])
+            for name, rows in SECTIONS.items():
+                self.assertEqual(reader.read_section(name), rows)
+
+    def test_without_mode(self):
+        self.write()
+        with open(self.verification_file) as f:
+            rows = list(csv.reader(f))
+        with open(self.verification_file, 'w') as f:  # the records of an older version, without the mode
+            csv.writer(f).writerows(row[:13] if not row[0].startswith("#") else row for row in rows)
+        with open_baseline(self.verification_file) as reader:
+            records = list(reader)
+        self.assertEqual([f_info.f_mode for f_info in records], [None] * len(self.records))
+        self.assertEqual([f_info.access_right for f_info in records],
+                         [f_info.access_right for f_info in self.records])
+        self.assertTrue(records[1].is_directory())
+        # against a record with a mode, the access rights are compared
+        self.assertEqual(core.compare_changes(records[0], self.records[0], ["mode"]), [])
+        self.assertEqual([finding.attribute for finding in core.compare_changes(records[0], self.records[3], ["mode"])],
+                         ["mode"])
+
+    def test_trailer(self):
+        self.write()
+        with open(self.verification_file, 'rb') as f:
+            content = f.read()
+        last_row = next(csv.reader([content.decode().splitlines()[-1]]))
+        self.assertEqual(last_row[0], CSV_TRAILER)
+        self.assertTrue(content[int(last_row[1]):].startswith(b"#rules,"))
+
+    def test_no_sections(self):
+        self.write(sections={})
+        with open_baseline(self.verification_file) as reader:
+            self.assertEqual(len(list(reader)), len(self.records))
+            self.assertIsNone(reader.read_section("rules"))
+
+    def test_compressed(self):
+        for compress in ("gzip", "xz"):
+            with self.subTest(compress=compress):
+                self.write(compress)
+                # streamed, never decompressed into a temporary file
+                with mock.patch.object(core, "decompressed_file", side_effect=AssertionError), \
+                        open_baseline(self.verification_file) as reader:
+                    self.assertEqual(reader.read_section("merkle"), SECTIONS["merkle"])
+                    with reader.reopen() as other:
+                        self.assertEqual([f_info.f_path for f_info in other],
+                                         [f_info.f_path for f_info in self.records])
+                    self.assertEqual([f_info.f_path for f_info in reader], [f_info.f_path for f_info in self.records])
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.monitored_dir = os.path.join(self.tmp_dir.name, "srv")
+        for d in range(4):
+            os.makedirs(os.path.join(self.monitored_dir, f"d{d}", "sub"))
+            for f in range(10):
+                with open(os.path.join(self.monitored_dir, f"d{d}", "sub" if f % 2 else "", f"f{f}"), 'w') as fd:
+                    fd.write(f"{d} {f}\n" * f)
+        os.link(os.path.join(self.monitored_dir, "d0", "f0"), os.path.join(self.monitored_dir, "d3", "hard"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_resume_is_identical(self):
+        for db_format, ext in (("csv", ".csv"), ("binary", ".sivdb")):
+            with self.subTest(db_format=db_format):
+                initialization_mode(self.monitored_dir, self.path("full" + ext), self.path("full.txt"), "sha256",
+                                    db_format=db_format, checkpoint_interval=0, overwrite=True)
+
+                # interrupt the run after some files, with a checkpoint after every record
+                stat_info = core.stat_info
+                calls = []
+
+                def interrupted(*args, **kwargs):
+                    calls.append(args[0])
+                    if len(calls) > 25:
+                        raise KeyboardInterrupt
+                    return stat_info(*args, **kwargs)
+
+                resumed = self.path("resumed" + ext)
+                with mock.patch.object(core, "stat_info", interrupted), self.assertRaises(KeyboardInterrupt):
+                    initialization_mode(self.monitored_dir, resumed, self.path("resumed.txt"), "sha256",
+                                        db_format=db_format, checkpoint_interval=1e-9, overwrite=True)
+                self.assertTrue(os.path.isfile(resumed + ".checkpoint"))
+                initialization_mode(self.monitored_dir, resumed, self.path("resumed.txt"), "sha256",
+                                    db_format=db_format, checkpoint_interval=1e-9, resume=True, overwrite=True)
+                self.assertFalse(os.path.isfile(resumed + ".checkpoint"))
+
+                with open(self.path("full" + ext), 'rb') as full, open(resumed, 'rb') as f:
+                    self.assertEqual(f.read(), full.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# System Integrity Verifier(SIV), the tests of the command line
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from siv.cli import main
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.monitored_dir = os.path.join(self.tmp_dir.name, "srv")
+        os.makedirs(os.path.join(self.monitored_dir, "d"))
+        for name in ("a", "d/b"):
+            with open(os.path.join(self.monitored_dir, name), 'w') as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def run_main(self, *args):
+        with mock.patch.object(sys, "argv", ["siv.py"] + list(args)), mock.patch("builtins.print"):
+            main()
+
+    def test_parser_without_core(self):
+        code = "import sys; from siv.cli import build_parser; build_parser(); print('siv.core' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_init_and_verify(self):
+        self.run_main("-i", "-D", self.monitored_dir, "-V", self.path("db"), "-R", self.path("init"), "-H", "sha256",
+                      "--fast-hash", "crc32", "--report-format", "jsonl")
+        self.assertTrue(os.path.isfile(self.path("db.csv")))
+        with open(os.path.join(self.monitored_dir, "a"), 'w') as f:
+            f.write("b")
+        self.run_main("-v", "-D", self.monitored_dir, "-V", self.path("db.csv"), "-R", self.path("verif"),
+                      "--deep", "--report-format", "jsonl")
+        with open(self.path("verif.jsonl")) as f:
+            self.assertIn('"attribute": "digest"', f.read())
+
+    def test_missing_package(self):
+        with mock.patch("siv.core.COMPRESS_LISTS", ["gzip", "xz"]), mock.patch("sys.stderr"), \
+                self.assertRaises(SystemExit):
+            self.run_main("-i", "-D", self.monitored_dir, "-V", self.path("db"), "-R", self.path("init"),
+                          "-H", "sha256", "--compress", "zstd")
+        self.assertFalse(os.path.exists(self.path("db.csv.zst")))
+
+
+if __name__ == '__main__':
+    unittest.main()
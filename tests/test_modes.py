@@ -0,0 +1,493 @@
+# System Integrity Verifier(SIV), the tests of the modes, from the initialization to the verification
+
+import json
+import os
+import signal
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from siv import core
+from siv.core import (DEEP_PERIOD, Hasher, Inotify, Metrics, Rules, SivError, initialization_mode, verification_mode,
+                      watch_mode, compare_mode, compare_report_file, open_baseline, run_shards, shard_bounds,
+                      shard_file, stored_shard_bounds)
+
+
+class ModeTest(unittest.TestCase):
+    """
+    a monitored directory of a few files and directories, initialized, changed and verified.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.monitored_dir = os.path.join(self.tmp_dir.name, "srv")
+        for name, content in [("a", "a"), ("b/y.log", "y"), ("b/z.tmp", "z"), ("c/d/e", "e" * 5000)]:
+            self.write(name, content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.monitored_dir, name)
+
+    def write(self, name: str, content: str, mode: str = 'w'):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), mode) as f:
+            f.write(content)
+
+    def init(self, **kwargs):
+        return initialization_mode(self.monitored_dir, os.path.join(self.tmp_dir.name, "db.csv"),
+                                   os.path.join(self.tmp_dir.name, "init.txt"), kwargs.pop("hash_fuc", "sha256"),
+                                   overwrite=True, **kwargs)
+
+    def verify(self, **kwargs) -> list:
+        """
+        the findings of a verification, as (type, path relative to the monitored directory, attribute).
+        """
+        report_file = os.path.join(self.tmp_dir.name, "verif.jsonl")
+        verification_mode(self.monitored_dir, os.path.join(self.tmp_dir.name, "db.csv"), report_file,
+                          report_format="jsonl", overwrite=True, **kwargs)
+        return findings(report_file, self.monitored_dir)
+
+    def summary(self) -> dict:
+        """
+        the summary of the last verification.
+        """
+        with open(os.path.join(self.tmp_dir.name, "verif.jsonl")) as f:
+            return json.loads(f.readlines()[-1])
+
+
+def findings(report_file: str, monitored_dir: str) -> list:
+    """
+    the findings of a JSON Lines report, as (type, path relative to "monitored_dir", attribute).
+    """
+    with open(report_file) as f:
+        records = [json.loads(line) for line in f]
+    return [(r["type"], os.path.relpath(r["path"], monitored_dir), r.get("attribute"))
+            for r in records if r["type"] != "summary"]
+
+
+class RulesTest(ModeTest):
+    def test_merge(self):
+        stored = Rules(["*.tmp"], ["*.log"], ["b/*=size"], ("/a", "/m"), follow_symlinks=True)
+        self.assertIs(stored.merge(None), stored)
+        merged = stored.merge(Rules(["log", "*.tmp"], checks=["*.log=user"]))
+        self.assertEqual(merged.excludes, ["*.tmp", "log"])
+        self.assertEqual(merged.includes, ["*.log"])
+        self.assertEqual(merged.check_rules(), ["*.log=user", "b/*=size"])
+        self.assertEqual(merged.path_range, ("/a", "/m"))
+        self.assertTrue(merged.follow_symlinks)
+        merged = stored.merge(Rules(includes=["*.txt"], path_range=("/b", None)))
+        self.assertEqual((merged.includes, merged.path_range), (["*.txt"], ("/b", None)))
+
+    def test_stored_rules_apply_with_given_ones(self):
+        self.init(rules=Rules(["*.tmp"], checks=[os.path.join(self.monitored_dir, "b", "*") + "=size"]))
+        self.write("b/z.tmp", "changed")
+        self.write("b/y.log", "Y")  # same size, only the digest and the date changed
+        self.write("x.log", "x")
+        self.assertEqual(self.verify(rules=Rules(["x.log"])), [])
+        self.assertEqual(self.verify(), [("created", "x.log", None)])
+
+    def test_excluded_directory_is_not_traversed(self):
+        self.init(rules=Rules(["d"]))
+        self.write("c/d/new", "new")
+        self.write("c/d/e", "changed")
+        self.write("c/f", "f")
+        self.assertEqual(self.verify(), [("changed", "c", "date"), ("created", "c/f", None)])
+
+    def test_include(self):
+        self.init(rules=Rules(includes=["*.log"]))
+        self.write("a", "changed")
+        self.write("b/y.log", "changed")
+        self.assertEqual([finding for finding in self.verify() if finding[2] != "date"],
+                         [("changed", "b/y.log", "size"), ("changed", "b/y.log", "digest")])
+
+
+class ShardTest(ModeTest):
+    def setUp(self):
+        super().setUp()
+        os.link(self.path("a"), self.path("c/d/link"))
+
+    def shard_files(self, name: str) -> list:
+        return [shard_file(os.path.join(self.tmp_dir.name, name), k, 2) for k in (1, 2)]
+
+    def test_stored_bounds(self):
+        bounds_file = os.path.join(self.tmp_dir.name, "bounds.json")
+        bounds = stored_shard_bounds(bounds_file, self.monitored_dir, 2)
+        self.assertEqual((bounds[0][0], bounds[-1][1]), (None, None))
+        self.assertEqual(bounds[0][1], bounds[1][0])
+        for name in ("a0", "a1", "a2", "a3"):
+            self.write(name, name)  # the bounds computed now would move
+        self.assertNotEqual(shard_bounds(self.monitored_dir, 2), bounds)
+        self.assertEqual(stored_shard_bounds(bounds_file, self.monitored_dir, 2), bounds)
+        with self.assertRaises(SivError):
+            stored_shard_bounds(bounds_file, self.monitored_dir, 3)
+
+    def test_shards_cover_the_tree(self):
+        self.init()
+        with open_baseline(os.path.join(self.tmp_dir.name, "db.csv")) as baseline:
+            paths = [f_info.f_path for f_info in baseline]
+        run_shards(initialization_mode, self.monitored_dir, os.path.join(self.tmp_dir.name, "db.csv"),
+                   os.path.join(self.tmp_dir.name, "init.txt"), 2, "sha256", overwrite=True)
+        shard_paths = []
+        for shard_verification_file in self.shard_files("db.csv"):
+            with open_baseline(shard_verification_file) as baseline:
+                shard_paths += [f_info.f_path for f_info in baseline]
+        self.assertEqual(shard_paths, paths)
+
+    def test_link_set_across_shards(self):
+        bounds = shard_bounds(self.monitored_dir, 2)
+        self.assertFalse(Rules(path_range=bounds[0]).in_range(self.path("c/d/link")))  # the set is split in two
+        run_shards(initialization_mode, self.monitored_dir, os.path.join(self.tmp_dir.name, "db.csv"),
+                   os.path.join(self.tmp_dir.name, "init.txt"), 2, "sha256", overwrite=True)
+        os.remove(self.path("c/d/link"))
+        self.write("c/d/link", "a")
+        report_file = os.path.join(self.tmp_dir.name, "verif.jsonl")
+        run_shards(verification_mode, self.monitored_dir, os.path.join(self.tmp_dir.name, "db.csv"),
+                   report_file, 2, report_format="jsonl", overwrite=True)
+        self.assertIn(("split", "a", "links"), findings(report_file, self.monitored_dir))
+        with open(report_file) as f:
+            summary = json.loads(f.readlines()[-1])
+        self.assertEqual(summary["warnings"], len(findings(report_file, self.monitored_dir)))
+
+
+class LinkTest(ModeTest):
+    def setUp(self):
+        super().setUp()
+        os.link(self.path("c/d/e"), self.path("b/link"))
+
+    def test_inode_is_hashed_once(self):
+        open_regular = core.open_regular
+        with mock.patch.object(core, "open_regular", side_effect=open_regular) as opened:
+            self.init()
+        opened_paths = [call.args[0] for call in opened.call_args_list]
+        self.assertEqual(len(opened_paths), 4)
+        self.assertNotEqual(self.path("b/link") in opened_paths, self.path("c/d/e") in opened_paths)
+        with open(os.path.join(self.tmp_dir.name, "init.txt")) as f:
+            self.assertRegex(f.read(), r"The number of hard links reused is: +'1'\.")
+        with open_baseline(os.path.join(self.tmp_dir.name, "db.csv")) as baseline:
+            digests = {f_info.f_path: f_info.message_digest for f_info in baseline}
+        self.assertEqual(digests[self.path("b/link")], digests[self.path("c/d/e")])
+
+    def test_split_link_set(self):
+        self.init()
+        self.assertEqual(self.verify(), [])
+        os.remove(self.path("b/link"))
+        self.write("b/link", "e" * 5000)  # a copy, the same content on another inode
+        changes = self.verify()
+        self.assertIn(("split", "b/link", "links"), changes)
+        self.assertNotIn(("changed", "b/link", "digest"), changes)
+
+
+class CompareTest(ModeTest):
+    def db(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def init_as(self, name: str, **kwargs):
+        initialization_mode(self.monitored_dir, self.db(name), self.db("init.txt"), kwargs.pop("hash_fuc", "sha256"),
+                            overwrite=True, **kwargs)
+
+    def test_same_as_verification(self):
+        self.init_as("old.csv")
+        self.init()
+        self.write("a", "b")
+        os.chmod(self.path("b/y.log"), 0o600)
+        self.write("c/new", "new")
+        changes = self.verify()
+        self.init_as("new.sivdb", db_format="binary")
+        results = compare_mode([self.db("old.csv"), self.db("new.sivdb")], self.db("compare.jsonl"),
+                               report_format="jsonl", overwrite=True)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(findings(self.db("compare.jsonl"), self.monitored_dir), changes)
+
+    def test_several_files(self):
+        self.init_as("golden.csv")
+        self.write("a", "host1")
+        self.init_as("host1.csv")
+        self.write("a", "a")
+        self.init_as("host2.csv")
+        report_file = self.db("report.jsonl")
+        compare_mode([self.db(name) for name in ("golden.csv", "host1.csv", "host2.csv")], report_file,
+                     report_format="jsonl", overwrite=True)
+        self.assertEqual(compare_report_file(report_file, self.db("host1.csv")), self.db("report.host1.jsonl"))
+        self.assertIn(("changed", "a", "digest"), findings(self.db("report.host1.jsonl"), self.monitored_dir))
+        self.assertNotIn(("changed", "a", "digest"), findings(self.db("report.host2.jsonl"), self.monitored_dir))
+        self.assertFalse(os.path.exists(report_file))
+
+    def test_other_hash_function(self):
+        self.init_as("old.csv")
+        self.init_as("new.csv", hash_fuc="sha512")
+        with self.assertRaises(SivError):
+            compare_mode([self.db("old.csv"), self.db("new.csv")], self.db("compare.txt"), overwrite=True)
+
+
+class ReportTest(ModeTest):
+    def records(self, report_file: str) -> list:
+        with open(report_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_jsonl_verification(self):
+        self.init()
+        self.write("a", "changed")
+        os.remove(self.path("b/z.tmp"))
+        changes = self.verify()
+        records = self.records(os.path.join(self.tmp_dir.name, "verif.jsonl"))
+        self.assertEqual([record["type"] for record in records].index("summary"), len(records) - 1)
+        self.assertEqual(records[-1]["warnings"], len(changes))
+        self.assertIn({"type": "changed", "path": self.path("a"), "attribute": "size", "old": 1, "new": 7}, records)
+        self.assertIn({"type": "deleted", "path": self.path("b/z.tmp")}, records)
+        self.assertEqual(set(records[-1]["throughput"]), {"mb_per_second", "files_per_second"})
+
+    def test_bulk_and_line_buffered(self):
+        report_file = os.path.join(self.tmp_dir.name, "report.jsonl")
+        for line_buffered in (False, True):
+            with self.subTest(line_buffered=line_buffered), \
+                    core.create_report(report_file, "jsonl", line_buffered=line_buffered) as report:
+                report.finding(core.Finding("created", self.path("x")), time_ns=0)
+                self.assertEqual(len(self.records(report_file)), 1 if line_buffered else 0)
+                report.summary([("warnings", "The number of warnings is", 1), ("total_time", "The total time is", 0.5)])
+        self.assertEqual(self.records(report_file), [
+            {"type": "created", "path": self.path("x"), "time": "1970-01-01 00:00:00.000000000 UTC"},
+            {"type": "summary", "warnings": 1, "total_time": 0.5}])
+
+
+class PipelineTest(ModeTest):
+    PIPELINES = [("pool", "thread", 4), ("pool", "process", 2), ("async", "thread", 4), ("async", "process", 2)]
+
+    def setUp(self):
+        super().setUp()
+        for d in range(3):
+            for f in range(40):
+                self.write(f"p{d}/f{f}", str(f) * f)
+        os.link(self.path("a"), self.path("p1/link"))
+
+    def traverse(self, pipeline: str = "pool", backend: str = "thread", jobs: int = 1) -> tuple:
+        metrics = Metrics()
+        records = [(f_info.f_path, f_info.f_size, f_info.f_mode, f_info.message_digest, f_info.inode)
+                   for f_info in core.traverse_dir(self.monitored_dir, Hasher("sha256"), jobs, backend,
+                                                   metrics=metrics, pipeline=pipeline)]
+        return records, metrics.counters
+
+    def test_same_as_sequential(self):
+        records, counters = self.traverse()
+        for pipeline, backend, jobs in self.PIPELINES:
+            with self.subTest(pipeline=pipeline, backend=backend):
+                self.assertEqual(self.traverse(pipeline, backend, jobs), (records, counters))
+
+    def test_init_change_verify(self):
+        self.init()
+        self.write("p0/f3", "changed")
+        os.remove(self.path("p1/f4"))
+        self.write("p2/new", "new")
+        os.chmod(self.path("p2/f5"), 0o600)
+        changes = self.verify()
+        self.assertTrue({("changed", "p0/f3", "digest"), ("deleted", "p1/f4", None), ("created", "p2/new", None),
+                         ("changed", "p2/f5", "mode")} <= set(changes))
+        for pipeline, backend, jobs in self.PIPELINES:
+            for fast in (False, True):
+                with self.subTest(pipeline=pipeline, backend=backend, fast=fast):
+                    self.assertEqual(self.verify(pipeline=pipeline, backend=backend, jobs=jobs, fast=fast), changes)
+
+
+class FastTest(ModeTest):
+    def test_same_findings_as_full_verification(self):
+        self.init()
+        self.write("a", "b")  # same size
+        self.write("b/y.log", "longer")
+        os.remove(self.path("b/z.tmp"))
+        changes = self.verify()
+        self.assertEqual(self.verify(fast=True), changes)
+        self.assertIn(("changed", "a", "digest"), changes)
+
+    def test_restored_date(self):
+        self.init()
+        stat = os.stat(self.path("c/d/e"))
+        self.write("c/d/e", "x" * 5000)
+        os.utime(self.path("c/d/e"), ns=(stat.st_atime_ns, stat.st_mtime_ns))  # the ctime still moves
+        self.assertEqual(self.verify(fast=True), [("changed", "c/d/e", "digest")])
+
+    def test_unchanged_files_are_trusted(self):
+        self.init()
+        os.chmod(self.path("b/y.log"), 0o600)
+        os.chmod(self.path("c/d"), 0o700)
+        self.assertEqual(self.verify(fast=True), [("changed", "b/y.log", "mode"), ("changed", "c/d", "mode")])
+        self.assertEqual(self.summary()["trusted_files"], 3)  # a, b/z.tmp and c/d/e, whose stat did not change
+        self.verify()
+        self.assertNotIn("trusted_files", self.summary())
+
+
+class MerkleTest(ModeTest):
+    def test_unchanged_tree(self):
+        self.init()
+        self.assertEqual(self.verify(fast=True), [])
+        self.assertEqual(self.summary()["unchanged_subtrees"], 1)  # the monitored directory itself
+
+    def test_changed_subtree(self):
+        self.init()
+        self.write("c/d/e", "changed")
+        changes = self.verify()
+        self.assertEqual(self.verify(fast=True), changes)
+        self.assertIn(("changed", "c/d/e", "digest"), changes)
+        self.assertEqual(self.summary()["unchanged_subtrees"], 1)  # b, but not c, c/d or the monitored directory
+
+    def test_changed_attribute_only(self):
+        self.init()
+        os.chmod(self.path("b/y.log"), 0o600)
+        self.assertEqual(self.verify(fast=True), [("changed", "b/y.log", "mode")])
+        self.assertEqual(self.summary()["unchanged_subtrees"], 1)  # c, with c/d in it
+
+
+class TwoTierTest(ModeTest):
+    def setUp(self):
+        super().setUp()
+        self.init(fast_fuc="crc32")
+
+    def test_init_stores_both_digests(self):
+        with open_baseline(os.path.join(self.tmp_dir.name, "db.csv")) as baseline:
+            files = [f_info for f_info in baseline if not f_info.is_directory()]
+        self.assertEqual(len(files), 4)
+        for f_info in files:
+            self.assertEqual((len(f_info.message_digest), len(f_info.fast_digest)), (64, 8))
+
+    def test_deep(self):
+        self.write("a", "b")  # same size
+        self.assertIn(("changed", "a", "digest"), self.verify(deep_period=1))
+        with self.assertLogs("siv", "WARNING"):
+            changes = self.verify(deep_period=0)
+        self.assertIn(("changed", "a", "fast_digest"), changes)
+        self.assertNotIn(("changed", "a", "digest"), changes)
+
+    def test_deep_period(self):
+        hasher = Hasher("sha256", fast_fuc="crc32")
+        self.assertEqual(hasher.deep_period, DEEP_PERIOD)
+        paths = [self.path(name) for name in ("a", "b/y.log", "b/z.tmp", "c/d/e")]
+        deep_days = {path: [] for path in paths}
+        for day in range(DEEP_PERIOD):
+            hasher.day = day
+            for path in paths:
+                if hasher.is_deep(path):
+                    deep_days[path].append(day)
+        self.assertEqual([len(days) for days in deep_days.values()], [1] * len(paths))
+
+
+class ChunkTest(ModeTest):
+    def setUp(self):
+        super().setUp()
+        for name in ("f1", "f2", "f3"):
+            self.write(f"c/{name}", name * 2500)
+
+    def init(self, **kwargs):
+        return super().init(chunk_size=1024, chunk_threshold=4096, **kwargs)
+
+    def digests(self) -> dict:
+        with open_baseline(os.path.join(self.tmp_dir.name, "db.csv")) as baseline:
+            return {f_info.f_path: f_info.message_digest for f_info in baseline}
+
+    def test_parallel_chunks_are_sequential_ones(self):
+        self.init()
+        digests = self.digests()
+        for backend in ("thread", "process"):
+            with self.subTest(backend=backend):
+                self.init(jobs=4, backend=backend)
+                self.assertEqual(self.digests(), digests)
+
+    def test_ranges(self):
+        self.init(jobs=2)
+        with open(self.path("c/d/e"), 'r+') as f:
+            f.seek(2100)
+            f.write("x")
+            f.seek(4999)
+            f.write("x")
+        self.verify(jobs=2)
+        with open(os.path.join(self.tmp_dir.name, "verif.jsonl")) as f:
+            records = [json.loads(line) for line in f]
+        self.assertIn({"type": "ranges", "path": self.path("c/d/e"), "attribute": "chunks", "old": None,
+                       "new": [[2048, 3072], [4096, 5000]]}, records)
+
+    def test_sampled_chunks(self):
+        self.init()
+        self.write("c/d/e", "x" * 5000)
+        changes = self.verify(jobs=2, sample_chunks=2)
+        self.assertIn(("ranges", "c/d/e", "chunks"), changes)
+
+    def test_chunk_threads_are_shared(self):
+        threads = set()
+        new_hash = core.new_hash
+
+        def hash_in_thread(hash_fuc):
+            threads.add(threading.get_ident())
+            return new_hash(hash_fuc)
+
+        with mock.patch.object(core, "new_hash", hash_in_thread):
+            self.init(jobs=3)
+        # the main thread, the 3 workers and the 3 chunk threads, not 3 chunk threads for each worker
+        self.assertLessEqual(len(threads), 7)
+        self.assertIs(core.chunk_pool(3), core.chunk_pool(3))
+        self.assertEqual(Hasher("sha256", chunk_jobs=8).process_share(3).chunk_jobs, 2)
+
+
+class WatchTest(ModeTest):
+    def setUp(self):
+        try:
+            Inotify().close()
+        except OSError:
+            self.skipTest("inotify is not available")
+        super().setUp()
+        self.init()
+        self.watched = []
+
+    def watch(self, events, in_thread: bool = True) -> list:
+        """
+        run the watch mode, every wait for events returns "events()", which stops it with KeyboardInterrupt;
+        the findings of its report.
+        """
+        add_watch = Inotify.add_watch
+
+        def watch_dir(inotify, path):
+            self.watched.append(path)
+            return add_watch(inotify, path)
+
+        report_file = os.path.join(self.tmp_dir.name, "watch.jsonl")
+        with mock.patch.object(Inotify, "read_events", autospec=True, side_effect=lambda inotify, timeout: events()), \
+                mock.patch.object(Inotify, "add_watch", watch_dir):
+            args = (self.monitored_dir, os.path.join(self.tmp_dir.name, "db.csv"), report_file)
+            kwargs = {"report_format": "jsonl", "overwrite": True}
+            if in_thread:
+                with ThreadPoolExecutor(1) as executor:
+                    executor.submit(watch_mode, *args, **kwargs).result()
+            else:
+                watch_mode(*args, **kwargs)
+        return findings(report_file, self.monitored_dir)
+
+    def test_overflow_watches_new_directories(self):
+        calls = []
+
+        def events():
+            calls.append(None)
+            if len(calls) > 1:
+                raise KeyboardInterrupt
+            self.write("c/new/deep/f", "f")  # created while the events are lost
+            return [(None, Inotify.IN_Q_OVERFLOW)]
+
+        self.assertIn(("created", "c/new/deep/f", None), self.watch(events))
+        self.assertIn(self.path("c/new/deep"), self.watched)
+
+    def test_signal_handler_is_restored(self):
+        def handler(signum, frame):
+            pass
+
+        def events():
+            self.assertIsNot(signal.getsignal(signal.SIGTERM), handler)
+            raise KeyboardInterrupt
+
+        previous_handler = signal.signal(signal.SIGTERM, handler)
+        try:
+            self.assertEqual(self.watch(events, in_thread=False), [])
+            self.assertIs(signal.getsignal(signal.SIGTERM), handler)
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+
+
+if __name__ == '__main__':
+    unittest.main()
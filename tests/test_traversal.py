@@ -0,0 +1,134 @@
+# System Integrity Verifier(SIV), the tests of the traversal of the monitored directories
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from siv import core
+from siv.core import Hasher, NameResolver, Metrics, Rules, collect_dir, open_regular, stat_path, traverse_dir
+
+
+class VanishedFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.monitored_dir = os.path.join(self.tmp_dir.name, "srv")
+        os.makedirs(self.monitored_dir)
+        for name in ("a", "gone", "z"):
+            with open(os.path.join(self.monitored_dir, name), 'w') as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.monitored_dir, name)
+
+    def test_stat_and_open_of_removed_path(self):
+        self.assertIsNone(stat_path(self.path("missing")))
+        self.assertIsNone(stat_path(os.path.join(self.path("a"), "below_a_file")))
+        self.assertEqual(open_regular(self.path("missing")), (None, None))
+
+    def test_replaced_file_is_not_hashed(self):
+        hasher = Hasher("sha256")
+        file_stat = os.stat(self.path("a"))
+        with open(self.path("a.new"), 'w') as f:
+            f.write("replaced")
+        os.replace(self.path("a.new"), self.path("a"))
+        metrics = Metrics()
+        self.assertIsNone(hasher.hash_file(self.path("a"), metrics, (file_stat.st_dev, file_stat.st_ino)))
+        self.assertEqual(metrics.counters["replaced_files"], 1)
+        new_stat = os.stat(self.path("a"))
+        self.assertIsNotNone(hasher.hash_file(self.path("a"), metrics, (new_stat.st_dev, new_stat.st_ino)))
+
+    def removed_after_listing(self, scan_dirs):
+        def scan(*args, **kwargs):
+            for entry in scan_dirs(*args, **kwargs):
+                if entry.name == "gone":
+                    os.remove(entry.path)
+                yield entry
+        return scan
+
+    def test_removed_after_listing_is_left_out(self):
+        for pipeline in ("pool", "async"):
+            with self.subTest(pipeline=pipeline):
+                with open(self.path("gone"), 'w') as f:
+                    f.write("gone")
+                metrics = Metrics()
+                with mock.patch.object(core, "scan_dirs", self.removed_after_listing(core.scan_dirs)):
+                    paths = [f_info.f_path for f_info in traverse_dir(self.monitored_dir, Hasher("sha256"), 2,
+                                                                      metrics=metrics, pipeline=pipeline)]
+                self.assertEqual(paths, [self.path("a"), self.path("z")])
+                self.assertEqual(metrics.counters["vanished_files"], 1)
+
+    def test_collect_dir(self):
+        with mock.patch.object(core, "scan_dirs", self.removed_after_listing(core.scan_dirs)):
+            paths = [f_info.f_path for f_info in collect_dir(self.monitored_dir, NameResolver())]
+        self.assertEqual(paths, [self.path("a"), self.path("z")])
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with open(self.path("a"), 'w') as f:
+            f.write("a")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_untimed(self):
+        for timed in (True, False):
+            with self.subTest(timed=timed):
+                metrics = Metrics(timed)
+                Hasher("sha256").hash_file(self.path("a"), metrics)
+                self.assertEqual((metrics.counters["hashed_files"], metrics.counters["hashed_bytes"]), (1, 1))
+                self.assertEqual(sum(metrics.latency_buckets), 1 if timed else 0)
+                self.assertEqual(sum(metrics.seconds.values()) > 0, timed)
+
+    def test_without_metrics(self):
+        hasher = Hasher("sha256")
+        self.assertEqual(hasher.hash_file(self.path("a")), hasher.hash_file(self.path("a"), Metrics()))
+        self.assertEqual(core.NULL_METRICS.counters, {})
+
+
+class SymlinkTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.monitored_dir = os.path.join(self.tmp_dir.name, "srv")
+        os.makedirs(os.path.join(self.monitored_dir, "d"))
+        with open(os.path.join(self.monitored_dir, "target"), 'w') as f:
+            f.write("target")
+        os.symlink("target", os.path.join(self.monitored_dir, "link"))
+        os.symlink("d", os.path.join(self.monitored_dir, "dir_link"))
+        os.symlink("missing", os.path.join(self.monitored_dir, "dangling"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def records(self, follow_symlinks: bool) -> dict:
+        rules = Rules(follow_symlinks=follow_symlinks)
+        return {os.path.basename(f_info.f_path): f_info
+                for f_info in traverse_dir(self.monitored_dir, Hasher("sha256", follow_symlinks=follow_symlinks),
+                                           rules=rules)}
+
+    def test_recorded(self):
+        records = self.records(False)
+        self.assertEqual(records["link"].link_target, "target")
+        self.assertIsNone(records["link"].message_digest)
+        self.assertEqual(records["dir_link"].link_target, "d")
+        self.assertEqual(records["dangling"].link_target, "missing")
+
+    def test_followed(self):
+        records = self.records(True)
+        self.assertIsNone(records["link"].link_target)
+        self.assertEqual(records["link"].message_digest, records["target"].message_digest)
+        self.assertTrue(records["dir_link"].is_directory())
+        # a dangling link is still taken as the link itself
+        self.assertEqual(records["dangling"].link_target, "missing")
+
+
+if __name__ == '__main__':
+    unittest.main()